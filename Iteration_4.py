@@ -1,12 +1,20 @@
 import tkinter as tk
-from tkinter import messagebox, colorchooser, simpledialog
+from tkinter import messagebox, colorchooser, simpledialog, filedialog
 import customtkinter as ctk
-import json
 import os
+import hashlib
+import copy
+import threading
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from calendar import monthrange, month_name
 from PIL import ImageTk, Image
+from kanban_engine import Task, KanbanEngine, PersistenceService, save_json_file, load_json_file
+from perf_monitor import monitor, process_rss, Heartbeat, Watchdog
 import random
+import sys
 
 # Create main window
 root = tk.Tk()
@@ -14,61 +22,119 @@ root.title("Motivation Pet & Task Manager")
 root.geometry("1400x800")
 
 # Load and prepare images for virtual pet
-def load_scaled_image(image_path, scale_factor=0.6):
-    """Load and scale images by a factor to maintain quality"""
-    try:
-        img = Image.open(image_path)
-        new_width = int(img.width * scale_factor)
-        new_height = int(img.height * scale_factor)
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        return ImageTk.PhotoImage(img)
-    except Exception as e:
-        print(f"Error loading image {image_path}: {e}")
-        #return a blank image as fallback
-        blank_img = Image.new('RGB', (100, 100), color='gray')
-        return ImageTk.PhotoImage(blank_img)
-
-#load all virtual pet images
-scale_factor = 0.5
+# Scaled images are cached on disk, keyed by the source file, its modification time
+# and the scale, so later launches only have to decode the small cached copy
+IMAGE_CACHE_DIR = ".image_cache"
 
-cat = load_scaled_image("images/cat1.png", scale_factor)
-cat_interact = load_scaled_image("images/cat2.png", scale_factor)
-cat_profile = load_scaled_image("images/caticon1.png", 0.4)
-cat_profile_interact = load_scaled_image("images/caticon2.png", 0.4)
+def image_cache_path(image_path, scale_factor):
+    stat = os.stat(image_path)
+    key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{scale_factor}"
+    return os.path.join(IMAGE_CACHE_DIR, hashlib.sha1(key.encode()).hexdigest() + ".png")
 
-bunny = load_scaled_image("images/bunny1.png", scale_factor)
-bunny_interact = load_scaled_image("images/bunny2.png", scale_factor)
-bunny_profile = load_scaled_image("images/bunnyicon1.png", 0.4)
-bunny_profile_interact = load_scaled_image("images/bunnyicon2.png", 0.4)
+def scale_image(image_path, scale_factor=0.6):
+    """Load and scale an image by a factor to maintain quality (uses the disk cache)"""
+    cache_path = image_cache_path(image_path, scale_factor)
+    try:
+        img = Image.open(cache_path)
+        img.load()
+        return img
+    except (OSError, ValueError):
+        pass  #not cached yet (or the cached copy is damaged)
+    
+    img = Image.open(image_path)
+    new_width = int(img.width * scale_factor)
+    new_height = int(img.height * scale_factor)
+    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    try:
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+        img.save(temp_path, "PNG", compress_level=1)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Error caching image {image_path}: {e}")
+    return img
 
-dog = load_scaled_image("images/dog1.png", scale_factor)
-dog_interact = load_scaled_image("images/dog2.png", scale_factor)
-dog_profile = load_scaled_image("images/dogicon1.png", 0.4)
-dog_profile_interact = load_scaled_image("images/dogicon2.png", 0.4)
+def load_scaled_images(images):
+    """Load and scale a list of (image path, scale factor), returns a PhotoImage for each"""
+    #PIL releases the GIL while it decodes and resizes, so the images are prepared in a
+    #thread pool. PhotoImages can only be made on the Tk thread, which is done here
+    start = time.perf_counter()
+    
+    def prepare(image):
+        image_start = time.perf_counter()
+        try:
+            img = scale_image(*image)
+        except Exception as e:
+            print(f"Error loading image {image[0]}: {e}")
+            img = None
+        return img, time.perf_counter() - image_start
+    
+    with ThreadPoolExecutor(max_workers=min(8, len(images)) or 1) as executor:
+        results = list(executor.map(prepare, images))
+    
+    photos = []
+    timings = []
+    for (image_path, _), (img, elapsed) in zip(images, results):
+        if img is None:
+            #use a blank image as fallback
+            img = Image.new('RGB', (100, 100), color='gray')
+        photos.append(ImageTk.PhotoImage(img))
+        timings.append(f"{os.path.basename(image_path)} {elapsed * 1000:.0f} ms")
+    print(f"Loaded {len(images)} images in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({', '.join(timings)})")
+    return photos
 
-fish = load_scaled_image("images/fish1.png", scale_factor)
-fish_interact = load_scaled_image("images/fish2.png", scale_factor)
-fish_profile = load_scaled_image("images/fishicon1.png", 0.4)
-fish_profile_interact = load_scaled_image("images/fishicon2.png", 0.4)
+#load the profile icons shown when choosing a pet. the full size pet images are
+#loaded by the pet the first time they are shown (see Pet.image)
+scale_factor = 0.5
+profile_scale_factor = 0.4
 
-hampy = load_scaled_image("images/hamp1.png", scale_factor)
-hampy_interact = load_scaled_image("images/hamp2.png", scale_factor)
-hampy_profile = load_scaled_image("images/hampicon1.png", 0.4)
-hampy_profile_interact = load_scaled_image("images/hampyicon2.png", 0.4)
+(cat_profile, cat_profile_interact,
+ bunny_profile, bunny_profile_interact,
+ dog_profile, dog_profile_interact,
+ fish_profile, fish_profile_interact,
+ hampy_profile, hampy_profile_interact) = load_scaled_images([
+    ("images/caticon1.png", profile_scale_factor), ("images/caticon2.png", profile_scale_factor),
+    ("images/bunnyicon1.png", profile_scale_factor), ("images/bunnyicon2.png", profile_scale_factor),
+    ("images/dogicon1.png", profile_scale_factor), ("images/dogicon2.png", profile_scale_factor),
+    ("images/fishicon1.png", profile_scale_factor), ("images/fishicon2.png", profile_scale_factor),
+    ("images/hampicon1.png", profile_scale_factor), ("images/hampyicon2.png", profile_scale_factor)
+])
 
 class Pet:
     #the parent class for all the pet.
-    def __init__(self, name, pet_type, image, interact_image, profile_image, profile_interact_image):
+    def __init__(self, name, pet_type, image_path, interact_image_path, profile_image, profile_interact_image):
         self.name = name
         self.pet_type = pet_type
-        self.image = image
-        self.interact_image = interact_image
+        self.image_path = image_path
+        self.interact_image_path = interact_image_path
+        self._image = None
+        self._interact_image = None
         self.profile_image = profile_image
         self.profile_interact_image = profile_interact_image
         self.custom_name = name.capitalize()  
         self.mood = "happy"
         self.last_interaction = datetime.now()
     
+    @property
+    def image(self):
+        if self._image is None:
+            self.load_images()
+        return self._image
+    
+    @property
+    def interact_image(self):
+        if self._interact_image is None:
+            self.load_images()
+        return self._interact_image
+    
+    def load_images(self):
+        #both full size images are loaded together the first time the pet is shown
+        self._image, self._interact_image = load_scaled_images([
+            (self.image_path, scale_factor),
+            (self.interact_image_path, scale_factor)
+        ])
+    
     def get_motivational_messages(self):
         #the children class get these motivational messages, and personalised ones based on the pet they are
         base_messages = [
@@ -109,7 +175,7 @@ class Pet:
 
 class Cat(Pet): #one of the child classes, the cat in particular
     def __init__(self):
-        super().__init__("cat", "playful", cat, cat_interact, cat_profile, cat_profile_interact)
+        super().__init__("cat", "playful", "images/cat1.png", "images/cat2.png", cat_profile, cat_profile_interact)
     
     def get_motivational_messages(self):
         base_messages = super().get_motivational_messages()
@@ -133,7 +199,7 @@ class Cat(Pet): #one of the child classes, the cat in particular
 
 class Bunny(Pet): #another child class, the bunny
     def __init__(self):
-        super().__init__("bunny", "energetic", bunny, bunny_interact, bunny_profile, bunny_profile_interact)
+        super().__init__("bunny", "energetic", "images/bunny1.png", "images/bunny2.png", bunny_profile, bunny_profile_interact)
     
     def get_motivational_messages(self):
         base_messages = super().get_motivational_messages()
@@ -157,7 +223,7 @@ class Bunny(Pet): #another child class, the bunny
 
 class Dog(Pet): #another child class, the dog
     def __init__(self):
-        super().__init__("dog", "loyal", dog, dog_interact, dog_profile, dog_profile_interact)
+        super().__init__("dog", "loyal", "images/dog1.png", "images/dog2.png", dog_profile, dog_profile_interact)
     
     def get_motivational_messages(self):
         base_messages = super().get_motivational_messages()
@@ -181,7 +247,7 @@ class Dog(Pet): #another child class, the dog
 
 class Fish(Pet): #another child class, the fish
     def __init__(self):
-        super().__init__("fish", "calm", fish, fish_interact, fish_profile, fish_profile_interact)
+        super().__init__("fish", "calm", "images/fish1.png", "images/fish2.png", fish_profile, fish_profile_interact)
     
     def get_motivational_messages(self):
         base_messages = super().get_motivational_messages()
@@ -205,7 +271,7 @@ class Fish(Pet): #another child class, the fish
 
 class Hamster(Pet): #final child class, the hamster
     def __init__(self):
-        super().__init__("hamster", "curious", hampy, hampy_interact, hampy_profile, hampy_profile_interact)
+        super().__init__("hamster", "curious", "images/hamp1.png", "images/hamp2.png", hampy_profile, hampy_profile_interact)
     
     def get_motivational_messages(self):
         base_messages = super().get_motivational_messages()
@@ -251,17 +317,16 @@ class VirtualPet:
     def load_pet_stats(self):
         #the pet stats that have been saved in a json file, in particular the name
         try:
-            if os.path.exists("pet_stats.json"):
-                with open("pet_stats.json", "r") as f:
-                    stats = json.load(f)
-                    pet_name = stats.get("current_pet")
-                    if pet_name in self.pets:
-                        self.current_pet = self.pets[pet_name]
-                        # Load custom names for all pets
-                        pets_data = stats.get("pets", {})
-                        for species, pet_data in pets_data.items():
-                            if species in self.pets:
-                                self.pets[species].custom_name = pet_data.get("custom_name", species.capitalize())
+            stats = load_json_file("pet_stats.json")
+            if stats is not None:
+                pet_name = stats.get("current_pet")
+                if pet_name in self.pets:
+                    self.current_pet = self.pets[pet_name]
+                    # Load custom names for all pets
+                    pets_data = stats.get("pets", {})
+                    for species, pet_data in pets_data.items():
+                        if species in self.pets:
+                            self.pets[species].custom_name = pet_data.get("custom_name", species.capitalize())
         except Exception as e:
             print(f"Error loading pet stats: {e}")
     
@@ -277,10 +342,16 @@ class VirtualPet:
                 "current_pet": self.current_pet.name if self.current_pet else None,
                 "pets": pets_data
             }
-            with open("pet_stats.json", "w") as f:
-                json.dump(stats, f, indent=4)
         except Exception as e:
             print(f"Error saving pet stats: {e}")
+            return
+        
+        def write():
+            try:
+                save_json_file("pet_stats.json", stats)
+            except Exception as e:
+                print(f"Error saving pet stats: {e}")
+        persistence.schedule("pet_stats", write)
     
     def show_selection_screen_full(self):
         #show the pet selection screen that needs to fill the entire screen
@@ -370,6 +441,8 @@ class VirtualPet:
         #making sure the virtual pet is on 1/3 of the screen and on the left
         self.main_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         #making sure the kanban board and calendar is filling 2/3 of the screen and on the right
+        if hasattr(self, 'kanban_board'):
+            self.kanban_board.close()
         self.kanban_board = KanbanBoard(self.parent, self)
         self.kanban_board.show()
         #ensuring that the pet background is the same color as the kanban board/calendar background
@@ -390,6 +463,7 @@ class VirtualPet:
         if self.current_pet:
             self.show_pet_screen()
     
+    @monitor.timed("show_pet_screen", "render")
     def show_pet_screen(self):
         #clear existing widgets
         for widget in self.main_frame.winfo_children():
@@ -487,6 +561,7 @@ class VirtualPet:
         #updates every 30 seconds to not feel bland
         self.parent.after(30000, self.update_motivational_message)
     
+    @monitor.timed("pet_click", "action")
     def on_pet_click(self, event):
         #the pet interaction when clicked
         if not self.current_pet:
@@ -508,43 +583,24 @@ class VirtualPet:
                 image=self.current_pet.image
             )
     
-    def task_completed(self):
-        #when task is complete, the task is called
+    def task_completed(self, count=1):
+        #when tasks are complete, the task is called (once for all tasks completed together)
         if not self.current_pet:
             return
         #update motivational message for completing task
-        celebrations = self.current_pet.get_celebrations()
+        celebration = random.choice(self.current_pet.get_celebrations())
+        if count > 1:
+            celebration = f"{count} tasks done at once! {celebration}"
         if hasattr(self, 'motivation_label'):
-            self.motivation_label.config(text=random.choice(celebrations), fg='#27ae60')
+            self.motivation_label.config(text=celebration, fg='#27ae60')
         # updates and saves the new stats
         self.save_pet_stats()
 
-class Task: #the task class with the info
-    def __init__(self, content, due_date=None, priority="medium"):
-        self.content = content
-        self.due_date = due_date
-        self.priority = priority
-        self.id = id(self)
-    
-    def to_dict(self):
-        #converts task to dictionary for JSON serialization
-        return {
-            "content": self.content,
-            "due_date": self.due_date.isoformat() if self.due_date else None,
-            "priority": self.priority,
-            "id": self.id
-        }
-    
-    @classmethod
-    def from_dict(cls, data):
-        #creates task from dictionary
-        due_date = datetime.fromisoformat(data["due_date"]).date() if data["due_date"] else None
-        task = cls(data["content"], due_date, data["priority"])
-        task.id = data["id"]
-        return task
-
 class CalendarView:
     #the calendar class that shows the calendar view with all the tasks
+    #the widgets are built once: a fixed grid of 42 day cells (6 weeks). changing the
+    #month only updates what the cells show, and after a task changes only the cells of
+    #the dates involved are updated
     def __init__(self, parent, kanban_board):
         self.parent = parent
         self.kanban_board = kanban_board
@@ -553,6 +609,8 @@ class CalendarView:
         #calendar state
         self.current_year = datetime.now().year
         self.current_month = datetime.now().month
+        self.cells = []  #the day cells, built the first time the calendar is shown
+        self.cells_by_date = {}  #date -> cell, for the month on display
     
     def show(self):
         #show the calendar by packing the main frame
@@ -563,12 +621,11 @@ class CalendarView:
         #hide the calendar
         self.main_frame.pack_forget()
     
-    def update_calendar(self):
-        #update the calendar display with current tasks
-        #clear the calendar frame first
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-        
+    def is_visible(self):
+        return self.main_frame.winfo_ismapped()
+    
+    def build(self):
+        #create the widgets that stay the same from month to month
         # Add toggle button for calendar view
         toggle_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         toggle_frame.pack(fill=tk.X, pady=10, padx=10)
@@ -601,13 +658,13 @@ class CalendarView:
         prev_btn.pack(side=tk.LEFT, padx=10)
         
         #month and year label
-        month_label = ctk.CTkLabel(
+        self.month_label = ctk.CTkLabel(
             header_frame,
-            text=f"{month_name[self.current_month]} {self.current_year}",
+            text="",
             font=self.kanban_board.get_font("bold", 20),
             text_color="black"  # Changed to black for better visibility
         )
-        month_label.pack(side=tk.LEFT, expand=True)
+        self.month_label.pack(side=tk.LEFT, expand=True)
         
         #next month button
         next_btn = ctk.CTkButton(
@@ -640,97 +697,36 @@ class CalendarView:
         calendar_grid = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         calendar_grid.pack(fill=tk.BOTH, expand=True, pady=10)
         
-        #get number of days in month and first weekday
-        num_days = monthrange(self.current_year, self.current_month)[1]
-        first_weekday = monthrange(self.current_year, self.current_month)[0]
-        
-        #get all tasks with due dates
-        all_tasks = []
-        for status in ["todo", "doing", "done"]:
-            all_tasks.extend(self.kanban_board.tasks[status])
-        
-        #group tasks by due date
-        tasks_by_date = {}
-        for task in all_tasks:
-            if task.due_date:
-                #check if task due date falls in current month
-                if (task.due_date.year == self.current_year and 
-                    task.due_date.month == self.current_month):
-                    date_str = task.due_date.strftime("%Y-%m-%d")
-                    if date_str not in tasks_by_date:
-                        tasks_by_date[date_str] = []
-                    tasks_by_date[date_str].append(task)
-        
-        #create empty cells for days before the first day of the month
-        row = 0
-        col = 0
-        for i in range(first_weekday):
-            empty_cell = ctk.CTkFrame(calendar_grid, width=140, height=120, fg_color="transparent")
-            empty_cell.grid(row=row, column=col, padx=2, pady=2, sticky="nsew")
-            col += 1
-        
-        #create cells for each day of the month
-        today = datetime.now().date()
-        
-        for day in range(1, num_days + 1):
-            if col > 6:
-                col = 0
-                row += 1
-            
-            #create day cell
-            cell_bg = "#edf2f4"
-            cell_date = datetime(self.current_year, self.current_month, day).date()
-            
-            #highlight today
-            if (cell_date == today and 
-                self.current_month == today.month and 
-                self.current_year == today.year):
-                cell_bg = "#ffe66d"  #yellow highlight for today
-            
-            cell = ctk.CTkFrame(calendar_grid, width=140, height=120, 
-                               corner_radius=10, border_width=2,
-                               border_color="#8d99ae", fg_color=cell_bg)
-            cell.grid(row=row, column=col, padx=2, pady=2, sticky="nsew")
+        #create the day cells, 6 weeks is the most a month can cover
+        for i in range(42):
+            cell = ctk.CTkFrame(calendar_grid, width=140, height=120,
+                               corner_radius=10, border_width=0, fg_color="transparent")
+            cell.grid(row=i // 7, column=i % 7, padx=2, pady=2, sticky="nsew")
             
             #day number
-            day_label = ctk.CTkLabel(
+            cell.day_label = ctk.CTkLabel(
                 cell,
-                text=str(day),
+                text="",
                 font=self.kanban_board.get_font("bold", 14),
                 text_color="black"  # Changed to black for better visibility
             )
-            day_label.place(x=5, y=5)
-            
-            #check if this day has tasks
-            date_str = f"{self.current_year}-{self.current_month:02d}-{day:02d}"
-            if date_str in tasks_by_date:
-                tasks = tasks_by_date[date_str]
-                
-                #show task count
-                count_label = ctk.CTkLabel(
-                    cell,
-                    text=f"{len(tasks)} task(s)",
-                    font=self.kanban_board.get_font(size=10),
-                    text_color="black"  # Changed to black for better visibility
-                )
-                count_label.place(x=5, y=30)
-                
-                #show task preview (first task only)
-                if tasks:
-                    task_preview = tasks[0].content
-                    if len(task_preview) > 15:
-                        task_preview = task_preview[:12] + "..."
-                    
-                    preview_label = ctk.CTkLabel(
-                        cell,
-                        text=task_preview,
-                        font=self.kanban_board.get_font(size=10),
-                        text_color="black",  # Changed to black for better visibility
-                        wraplength=130
-                    )
-                    preview_label.place(x=5, y=50)
-            
-            col += 1
+            #task count
+            cell.count_label = ctk.CTkLabel(
+                cell,
+                text="",
+                font=self.kanban_board.get_font(size=10),
+                text_color="black"  # Changed to black for better visibility
+            )
+            #task preview (first task only)
+            cell.preview_label = ctk.CTkLabel(
+                cell,
+                text="",
+                font=self.kanban_board.get_font(size=10),
+                text_color="black",  # Changed to black for better visibility
+                wraplength=130
+            )
+            cell.shown = None  #what the cell displays right now
+            self.cells.append(cell)
         
         #configure grid weights for proper resizing
         for i in range(7):
@@ -738,6 +734,93 @@ class CalendarView:
         for i in range(6):  #maximum 6 rows in a month
             calendar_grid.rowconfigure(i, weight=1)
     
+    def get_tasks_by_date(self):
+        #tasks due in the displayed month, grouped by due date
+        #only the tasks due this month are looked at, through the board's due date index
+        tasks_by_date = {}
+        for task in self.kanban_board.engine.due_index.in_month(self.current_year, self.current_month):
+            due_date = task.due_date
+            if due_date not in tasks_by_date:
+                tasks_by_date[due_date] = []
+            tasks_by_date[due_date].append(task)
+        return tasks_by_date
+    
+    @monitor.timed("update_calendar", "render")
+    def update_calendar(self):
+        #update the calendar display with the current month and its tasks
+        if not self.cells:
+            self.build()
+        self.month_label.configure(text=f"{month_name[self.current_month]} {self.current_year}")
+        
+        #get number of days in month and first weekday
+        num_days = monthrange(self.current_year, self.current_month)[1]
+        first_weekday = monthrange(self.current_year, self.current_month)[0]
+        tasks_by_date = self.get_tasks_by_date()
+        
+        #cells before the first and after the last day of the month stay empty
+        self.cells_by_date = {}
+        for i, cell in enumerate(self.cells):
+            day = i - first_weekday + 1
+            if 1 <= day <= num_days:
+                cell_date = datetime(self.current_year, self.current_month, day).date()
+                self.cells_by_date[cell_date] = cell
+                self.show_day(cell, cell_date, tasks_by_date.get(cell_date, []))
+            else:
+                self.show_day(cell, None, [])
+    
+    @monitor.timed("refresh_calendar_dates", "render")
+    def refresh_dates(self, dates):
+        #update just the cells of these dates after tasks due on them changed. a hidden
+        #calendar is brought up to date when it is shown again
+        if not self.cells or not self.is_visible():
+            return
+        cells = [(cell_date, self.cells_by_date[cell_date]) for cell_date in dates
+                 if cell_date in self.cells_by_date]
+        if not cells:
+            return
+        tasks_by_date = self.get_tasks_by_date()
+        for cell_date, cell in cells:
+            self.show_day(cell, cell_date, tasks_by_date.get(cell_date, []))
+    
+    def show_day(self, cell, cell_date, tasks):
+        #show one day (or an empty cell if cell_date is None), changing only what differs
+        if cell_date is None:
+            shown = None
+        else:
+            #highlight today
+            cell_bg = "#ffe66d" if cell_date == datetime.now().date() else "#edf2f4"
+            count_text = f"{len(tasks)} task(s)" if tasks else ""
+            task_preview = ""
+            if tasks:
+                task_preview = tasks[0].content
+                if len(task_preview) > 15:
+                    task_preview = task_preview[:12] + "..."
+            shown = (cell_date.day, cell_bg, count_text, task_preview)
+        if shown == cell.shown:
+            return
+        
+        if shown is None:
+            cell.configure(fg_color="transparent", border_width=0)
+            cell.day_label.place_forget()
+            cell.count_label.place_forget()
+            cell.preview_label.place_forget()
+        else:
+            day, cell_bg, count_text, task_preview = shown
+            if cell.shown is None:
+                cell.configure(border_width=2, border_color="#8d99ae")
+                cell.day_label.place(x=5, y=5)
+            cell.configure(fg_color=cell_bg)
+            cell.day_label.configure(text=str(day))
+            if count_text:
+                cell.count_label.configure(text=count_text)
+                cell.count_label.place(x=5, y=30)
+                cell.preview_label.configure(text=task_preview)
+                cell.preview_label.place(x=5, y=50)
+            else:
+                cell.count_label.place_forget()
+                cell.preview_label.place_forget()
+        cell.shown = shown
+    
     def change_calendar_month(self, delta):
         #change the calendar month by delta (-1 for previous, 1 for next)
         self.current_month += delta
@@ -751,10 +834,591 @@ class CalendarView:
         
         self.update_calendar()
 
+class TaskRow:
+    #one row of a task column: the frame coloured by priority with the task text, the
+    #due date and the buttons for that column. a column only has rows for the tasks in
+    #view, and a row is handed a different task whenever the list scrolls
+    def __init__(self, column_view):
+        board = column_view.board
+        column = column_view.column
+        self.board = board
+        self.task = None
+        self.shown = None  # what the row displays right now, to skip needless updates
+        self.y = None  # where the row is placed, None while hidden
+        
+        # Task frame
+        self.frame = ctk.CTkFrame(
+            column_view.viewport,
+            corner_radius=10,
+            border_width=1,
+            border_color="#8d99ae"
+        )
+        
+        # Task content
+        self.content_label = ctk.CTkLabel(
+            self.frame,
+            text="",
+            font=board.get_font(),
+            text_color="#2b2d42",
+            wraplength=250,
+            justify="left"
+        )
+        self.content_label.pack(pady=5, padx=10, anchor="w")
+        
+        # Due date
+        self.due_label = ctk.CTkLabel(
+            self.frame,
+            text="",
+            font=board.get_font(),
+            text_color="#2b2d42"
+        )
+        self.due_label.pack(pady=2, padx=10, anchor="w")
+        
+        # Button frame
+        self.button_frame = ctk.CTkFrame(self.frame, fg_color="transparent")
+        self.button_frame.pack(pady=5, padx=5, fill=tk.X)
+        
+        # Buttons based on column, they act on whichever task the row shows
+        if column == "todo":
+            self.add_button("Edit", 60, "#4cc9f0", "#3a97b8", lambda: board.edit_task(self.task))
+            self.add_button("Start", 60, "#06d6a0", "#05a181", lambda: board.move_task(self.task, column, "doing"))
+            self.add_button("Delete", 60, "#ef233c", "#d90429", lambda: board.delete_task(self.task, column))
+        elif column == "doing":
+            self.add_button("Edit", 60, "#4cc9f0", "#3a97b8", lambda: board.edit_task(self.task))
+            self.add_button("Back", 60, "#9d4edd", "#7a3bad", lambda: board.move_task(self.task, column, "todo"))
+            self.add_button("Complete", 60, "#06d6a0", "#05a181", lambda: board.move_task(self.task, column, "done"))
+            self.add_button("Delete", 60, "#ef233c", "#d90429", lambda: board.delete_task(self.task, column))
+        else:  # done column
+            self.add_button("Reopen", 80, "#9d4edd", "#7a3bad", lambda: board.move_task(self.task, column, "doing"))
+            self.add_button("Delete", 80, "#ef233c", "#d90429", lambda: board.delete_task(self.task, column))
+    
+    def flash(self):
+        #outline the row for a moment, to show where a task is
+        self.frame.configure(border_width=3, border_color="#ef233c")
+        self.frame.after(1500, lambda: self.frame.configure(border_width=1, border_color="#8d99ae"))
+    
+    def add_button(self, text, width, fg_color, hover_color, command):
+        button = ctk.CTkButton(
+            self.button_frame,
+            text=text,
+            width=width,
+            font=self.board.get_font(size=10),
+            fg_color=fg_color,
+            hover_color=hover_color,
+            command=command
+        )
+        button.pack(side=tk.LEFT, padx=5)
+    
+    @monitor.timed("show_task_row", "render")
+    def show(self, task, max_chars=None):
+        #point the row at a task and update whatever changed since it was last shown
+        self.task = task
+        colors = self.board.settings["colors"]
+        
+        # Determine priority color
+        if task.priority == "high":
+            bg_color = colors["high_priority"]
+        elif task.priority == "low":
+            bg_color = colors["low_priority"]
+        else:
+            bg_color = colors["medium_priority"]
+        
+        # Long descriptions are cut to fit the fixed row height
+        content = task.content
+        if max_chars and len(content) > max_chars:
+            content = content[:max_chars - 3] + "..."
+        
+        # Due date if exists, color coded if the task is overdue or due soon
+        due_text = ""
+        due_color = "#2b2d42"
+        if task.due_date:
+            due_date_str = task.due_date.strftime("%Y-%m-%d")
+            due_text = f"Due: {due_date_str}"
+            days_until_due = (task.due_date - datetime.now().date()).days
+            if days_until_due < 0:
+                due_color = "#d90429"
+                due_text = f"OVERDUE: {due_date_str}"
+            elif days_until_due == 0:
+                due_color = "#ff9e00"
+                due_text = "Due: Today"
+            elif days_until_due <= 2:
+                due_color = "#ff9e00"
+                due_text = f"Due: {days_until_due} days"
+        
+        shown = (bg_color, content, due_text, due_color)
+        if shown == self.shown:
+            return
+        old_bg, old_content, old_due_text, old_due_color = self.shown or (None, None, None, None)
+        if bg_color != old_bg:
+            self.frame.configure(fg_color=bg_color)
+        if content != old_content:
+            self.content_label.configure(text=content)
+        if (due_text, due_color) != (old_due_text, old_due_color):
+            self.due_label.configure(text=due_text, text_color=due_color)
+        self.shown = shown
+    
+    def place(self, y):
+        if y != self.y:
+            self.frame.place(x=0, y=y, relwidth=1)
+            self.y = y
+    
+    def hide(self):
+        if self.y is not None:
+            self.frame.place_forget()
+            self.y = None
+    
+    def destroy(self):
+        self.frame.destroy()
+
+class VirtualTaskColumn:
+    #the scrolling task list of one kanban column. only the tasks in view (plus a few
+    #above and below) get row widgets, and those rows are reused as the list scrolls,
+    #so a column with thousands of tasks opens and scrolls as fast as one with a dozen.
+    #a row stays with its task while the task is in view, so when a task is added,
+    #moved or deleted the other rows just shift; rows that go out of view wait in a
+    #pool and are handed to the next task that comes into view.
+    #making new row widgets is the slow part, so a render makes them for at most
+    #RENDER_BUDGET seconds (most urgent task first) and leaves the rest to the next
+    #idle moment, when the window has painted and handled input in between
+    OVERSCAN = 2  # extra rows above and below the view
+    ROW_GAP = 10  # space between rows
+    WHEEL_STEP = 40  # how far one mouse wheel step scrolls
+    RENDER_BUDGET = 0.015  # seconds of row making per render
+    PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+    
+    def __init__(self, parent, board, column):
+        self.board = board
+        self.column = column
+        self.tasks = []  # the tasks of the column, in board order
+        self.offset = 0  # how far the list is scrolled down
+        self.visible_rows = {}  # task id -> the row showing that task
+        self.spare_rows = []  # rows not showing anything right now
+        self.row_height = None  # measured from a real row when first needed
+        self.max_chars = None
+        self.render_job = None  # the idle callback finishing a render, if one is waiting
+        
+        self.scrollbar = ctk.CTkScrollbar(
+            parent,
+            command=self.yview,
+            button_color="#8d99ae",
+            button_hover_color="#6c7a9e"
+        )
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.viewport = ctk.CTkFrame(parent, fg_color="transparent")
+        self.viewport.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.viewport.bind("<Configure>", lambda e: self.render())
+        # The mouse wheel is bound once for the whole board, see KanbanBoard.on_mouse_wheel
+    
+    def set_tasks(self, tasks):
+        #show a new list of tasks (e.g. after a task was added, moved or deleted)
+        self.tasks = list(tasks)
+        self.render()
+    
+    def relayout(self):
+        #the font changed: measure the rows again and resize the existing ones
+        self.row_height = None
+        self.measure_rows()
+        for row in list(self.visible_rows.values()) + self.spare_rows:
+            row.frame.configure(height=self.row_height - self.ROW_GAP)
+        self.render()
+    
+    def scaling(self):
+        return ctk.ScalingTracker.get_widget_scaling(self.viewport)
+    
+    def measure_rows(self):
+        #all rows are as high as a row with two lines of text and a due date
+        row = TaskRow(self)
+        row.show(Task("Ag\nAg", datetime.now().date() + timedelta(days=7), task_id=0))
+        row.frame.update_idletasks()
+        self.row_height = row.frame.winfo_reqheight() / self.scaling() + self.ROW_GAP
+        row.frame.destroy()
+        # About two lines of text fit in a row
+        # (the shared font is unscaled, like the 250 pixel wide text)
+        font = self.board.get_font()
+        average_width = font.measure("abcdefghijklmnopqrstuvwxyz") / 26 or 1
+        self.max_chars = int(2 * 250 / average_width)
+    
+    def new_row(self):
+        row = TaskRow(self)
+        row.frame.configure(height=self.row_height - self.ROW_GAP)
+        row.frame.pack_propagate(False)
+        return row
+    
+    @monitor.timed("render_column", "render")
+    def render(self):
+        #place rows for the tasks in view, reusing the existing row widgets
+        if self.row_height is None:
+            self.measure_rows()
+        view_height = self.viewport.winfo_height() / self.scaling()
+        total_height = len(self.tasks) * self.row_height
+        self.offset = max(0, min(self.offset, total_height - view_height))
+        
+        first = max(0, int(self.offset // self.row_height) - self.OVERSCAN)
+        last = min(len(self.tasks), int((self.offset + view_height) // self.row_height) + 1 + self.OVERSCAN)
+        in_view = self.tasks[first:last]
+        
+        # Rows of tasks that left the view go back to the pool
+        wanted = {task.id for task in in_view}
+        for task_id in [task_id for task_id in self.visible_rows if task_id not in wanted]:
+            self.spare_rows.append(self.visible_rows.pop(task_id))
+        
+        missing = []  # tasks in view that need a new row
+        for index, task in enumerate(in_view, first):
+            row = self.visible_rows.get(task.id)
+            if row is None:
+                if not self.spare_rows:
+                    missing.append((index, task))
+                    continue
+                row = self.spare_rows.pop()
+                self.visible_rows[task.id] = row
+            row.show(task, self.max_chars)
+            row.place(index * self.row_height - self.offset)
+        for row in self.spare_rows:
+            row.hide()
+        
+        # New rows for the most urgent tasks first, until the budget is used up
+        missing.sort(key=lambda item: self.urgency(item[1]))
+        deadline = time.perf_counter() + self.RENDER_BUDGET
+        for count, (index, task) in enumerate(missing):
+            if count and time.perf_counter() > deadline:
+                self.schedule_render()
+                break
+            row = self.new_row()
+            self.visible_rows[task.id] = row
+            row.show(task, self.max_chars)
+            row.place(index * self.row_height - self.offset)
+        
+        if total_height > 0:
+            self.scrollbar.set(self.offset / total_height, min(1, (self.offset + view_height) / total_height))
+        else:
+            self.scrollbar.set(0, 1)
+    
+    def urgency(self, task):
+        #sort key: overdue and soonest due first (no due date last), then by priority
+        return (task.due_ordinal or float("inf"), self.PRIORITY_ORDER.get(task.priority, 1))
+    
+    def schedule_render(self):
+        if self.render_job is None:
+            self.render_job = self.viewport.after_idle(self.finish_render)
+    
+    def cancel_render(self):
+        if self.render_job is not None:
+            self.viewport.after_cancel(self.render_job)
+            self.render_job = None
+    
+    def finish_render(self):
+        self.render_job = None
+        if self.viewport.winfo_exists():
+            self.render()
+    
+    def yview(self, *args):
+        #called by the scrollbar ("moveto", fraction) or ("scroll", amount, "units"/"pages")
+        if args[0] == "moveto":
+            self.offset = float(args[1]) * len(self.tasks) * (self.row_height or 0)
+        elif args[0] == "scroll":
+            step = self.row_height if args[2] == "units" else self.viewport.winfo_height() / self.scaling()
+            self.offset += int(args[1]) * step
+        self.render()
+    
+    def scroll_to(self, task):
+        #scroll so task is in the middle of the view and point it out
+        index = self.tasks.index(task)
+        if self.row_height is None:
+            self.measure_rows()
+        view_height = self.viewport.winfo_height() / self.scaling()
+        self.offset = index * self.row_height - (view_height - self.row_height) / 2
+        self.render()
+        row = self.visible_rows.get(task.id)
+        if row is not None:
+            row.flash()
+    
+    def contains(self, path):
+        #whether the widget with this path name is the list or one of its rows
+        viewport = str(self.viewport)
+        return path == viewport or path.startswith(viewport + ".")
+    
+    def on_mouse_wheel(self, event):
+        if event.num == 4:
+            steps = -1
+        elif event.num == 5:
+            steps = 1
+        elif sys.platform == "darwin":
+            steps = -event.delta
+        else:
+            steps = -event.delta / 120
+        self.offset += steps * self.WHEEL_STEP
+        self.render()
+
+class PerformanceOverlay:
+    #a small window kept on top of the app with the p50/p95 times of the hot paths,
+    #the number of widgets and the memory in use, refreshed every second. timing is
+    #switched on while it is open
+    REFRESH_MS = 1000
+    
+    def __init__(self, root, on_close=None):
+        self.root = root
+        self.on_close = on_close
+        self.window = None
+        self.refresh_job = None
+        self.was_enabled = False
+    
+    def show(self):
+        if self.window is not None:
+            return
+        self.was_enabled = monitor.enabled
+        monitor.enabled = True
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Performance")
+        self.window.attributes("-topmost", True)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.label = tk.Label(self.window, font=("Courier", 10), justify=tk.LEFT, anchor="nw",
+                              bg="#1e1e1e", fg="#d4d4d4", padx=10, pady=10)
+        self.label.pack(fill=tk.BOTH, expand=True)
+        self.refresh()
+    
+    def hide(self):
+        if self.window is None:
+            return
+        if self.refresh_job is not None:
+            self.root.after_cancel(self.refresh_job)
+            self.refresh_job = None
+        self.window.destroy()
+        self.window = None
+        monitor.enabled = self.was_enabled
+    
+    def close(self):
+        #closed with the window's own close button
+        self.hide()
+        if self.on_close:
+            self.on_close()
+    
+    def count_widgets(self):
+        count = 0
+        widgets = [self.root]
+        while widgets:
+            widget = widgets.pop()
+            count += 1
+            widgets.extend(widget.winfo_children())
+        return count
+    
+    def refresh(self):
+        lines = [f"{'operation':<18}{'calls':>7}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}"]
+        stats = monitor.stats()
+        for name, stat in stats.items():
+            lines.append(f"{name:<18}{stat['count']:>7}{stat['p50'] * 1000:>9.1f}"
+                         f"{stat['p95'] * 1000:>9.1f}{stat['max'] * 1000:>9.1f}")
+        if not stats:
+            lines.append("(nothing timed yet)")
+        lines.append("")
+        lines.append(f"widgets: {self.count_widgets()}")
+        rss = process_rss()
+        lines.append(f"memory:  {rss / 2**20:.1f} MiB" if rss else "memory:  unknown")
+        self.label.configure(text="\n".join(lines))
+        self.refresh_job = self.root.after(self.REFRESH_MS, self.refresh)
+
+class QuickSwitcher:
+    #Ctrl+K: a small window listing the tasks most like what is typed, in any column.
+    #typos are fine (the engine ranks tasks by shared trigrams). Up/Down pick a task,
+    #Enter or a click jumps the board to it
+    LIMIT = 10
+    
+    def __init__(self, board):
+        self.board = board
+        self.window = None
+        self.results = []  # [(column, task), ...] best match first
+        self.buttons = []
+        self.selected = 0
+    
+    def show(self):
+        if self.window is not None:
+            self.window.lift()
+            self.entry.focus_set()
+            return
+        board = self.board
+        self.window = ctk.CTkToplevel(board.root)
+        self.window.title("Go to Task")
+        self.window.geometry("450x420")
+        self.window.transient(board.root)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.entry = ctk.CTkEntry(
+            self.window,
+            font=board.get_font(),
+            corner_radius=10,
+            placeholder_text="Type part of a task"
+        )
+        self.entry.pack(fill=tk.X, padx=15, pady=15)
+        self.entry.bind("<KeyRelease>", self.update_results)
+        self.entry.bind("<Down>", lambda e: self.move_selection(1))
+        self.entry.bind("<Up>", lambda e: self.move_selection(-1))
+        self.entry.bind("<Return>", lambda e: self.choose(self.selected))
+        self.entry.bind("<Escape>", lambda e: self.close())
+        
+        # One button per result, reused for every query
+        list_frame = ctk.CTkFrame(self.window, fg_color="transparent")
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=(0, 15))
+        self.buttons = []
+        for index in range(self.LIMIT):
+            button = ctk.CTkButton(
+                list_frame,
+                text="",
+                font=board.get_font(),
+                anchor="w",
+                fg_color="transparent",
+                text_color=board.settings["colors"]["text"],
+                hover_color="#586D75",
+                command=lambda index=index: self.choose(index)
+            )
+            board.theme.register(button, "text", "text_color")
+            self.buttons.append(button)
+        self.results = []
+        # The window has to be drawn before it can take the focus
+        self.window.after(100, self.entry.focus_set)
+    
+    def close(self):
+        if self.window is not None:
+            self.window.destroy()
+            self.window = None
+    
+    def update_results(self, event=None):
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape"):
+            return
+        with monitor.span("quick_switcher", "action"):
+            self.results = self.board.engine.find_similar(self.entry.get(), self.LIMIT)
+        self.selected = 0
+        for index, button in enumerate(self.buttons):
+            if index < len(self.results):
+                column, task = self.results[index]
+                content = " ".join(task.content.split())
+                if len(content) > 45:
+                    content = content[:42] + "..."
+                button.configure(text=f"{content}  ({self.board.column_frames[column].title})")
+                if not button.winfo_ismapped():
+                    button.pack(fill=tk.X, pady=2)
+            else:
+                button.pack_forget()
+        self.show_selection()
+    
+    def show_selection(self):
+        for index, button in enumerate(self.buttons):
+            button.configure(fg_color="#5D8DA0" if index == self.selected else "transparent")
+    
+    def move_selection(self, step):
+        if self.results:
+            self.selected = (self.selected + step) % len(self.results)
+            self.show_selection()
+    
+    def choose(self, index):
+        if index >= len(self.results):
+            return
+        task = self.results[index][1]
+        self.close()
+        self.board.show_task(task)
+
+class FontRegistry:
+    #which font families are installed. asking Tk lists every font on the system, so
+    #it is done once at startup and again only when a font may have been installed
+    DYSLEXIA_FAMILIES = ["OpenDyslexic", "Arial"]  # in order of preference
+    DEFAULT_FAMILY = "Calibri"
+    
+    def __init__(self, root):
+        self.root = root
+        self.families = set()
+        self.refresh()
+    
+    def refresh(self):
+        try:
+            self.families = set(tk.font.families(self.root))
+        except tk.TclError as e:
+            print(f"Error listing fonts: {e}")
+    
+    def is_available(self, family):
+        return family in self.families
+    
+    def resolve(self, dyslexia_mode):
+        #the family to use for the board's fonts
+        if not dyslexia_mode:
+            return self.DEFAULT_FAMILY
+        for family in self.DYSLEXIA_FAMILIES:
+            if self.is_available(family):
+                return family
+        # Arial is Tk's fallback anyway when it is missing
+        return self.DYSLEXIA_FAMILIES[-1]
+
+class ThemeEngine:
+    #knows which widgets show which palette color (their "role": a key of the color
+    #settings, e.g. "todo" or "background") so a new palette only reconfigures the
+    #widgets of the colors that changed. things drawn from the palette rather than
+    #configured with it (task rows, the pet screen) register a callback instead
+    def __init__(self):
+        self.colors = {}  # the palette applied last
+        self.widgets = {}  # role -> [(widget, option), ...]
+        self.callbacks = {}  # role -> [callback, ...]
+        self.appearance_mode = None
+    
+    def register(self, widget, role, option="fg_color"):
+        self.widgets.setdefault(role, []).append((widget, option))
+        # Dialogs come and go, their widgets leave the registry with them
+        widget.bind("<Destroy>", lambda e: self.unregister(widget, role), add="+")
+    
+    def unregister(self, widget, role):
+        widgets = self.widgets.get(role)
+        if widgets:
+            self.widgets[role] = [entry for entry in widgets if entry[0] is not widget]
+    
+    def on_change(self, roles, callback):
+        for role in roles:
+            self.callbacks.setdefault(role, []).append(callback)
+    
+    @staticmethod
+    def is_dark_color(hex_color):
+        # Convert hex to RGB
+        hex_color = hex_color.lstrip('#')
+        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+        
+        # Calculate luminance
+        luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
+        return luminance < 0.5
+    
+    def apply(self, colors):
+        #bring the widgets up to date with colors, returns the roles that changed
+        changed = [role for role, color in colors.items() if self.colors.get(role) != color]
+        self.colors = dict(colors)
+        callbacks = []
+        for role in changed:
+            # Widgets destroyed since they were registered (e.g. a closed dialog) are dropped
+            widgets = [(widget, option) for widget, option in self.widgets.get(role, [])
+                       if widget.winfo_exists()]
+            self.widgets[role] = widgets
+            for widget, option in widgets:
+                widget.configure(**{option: colors[role]})
+            for callback in self.callbacks.get(role, []):
+                if callback not in callbacks:
+                    callbacks.append(callback)
+        for callback in callbacks:
+            callback()
+        
+        # Switching the appearance mode redraws every customtkinter widget, only do it
+        # when the background moved between light and dark
+        if "background" in changed:
+            mode = "dark" if self.is_dark_color(colors["background"]) else "light"
+            if mode != self.appearance_mode:
+                self.appearance_mode = mode
+                ctk.set_appearance_mode(mode)
+        return changed
+
 class KanbanBoard: #the kanban board class with all the information within
+    SEARCH_DELAY_MS = 150  # how long typing has to pause before the board is searched
+    
     def __init__(self, parent, virtual_pet):
         self.root = parent
         self.virtual_pet = virtual_pet
+        self.font_registry = FontRegistry(parent)
+        self.fonts = {}  # (weight, size) -> the shared font, see get_font
+        self.search_query = ""  # what the columns are filtered by
+        self.search_cache = (None, None)  # (query and versions, results), see search_results
+        self.search_job = None  # the pending search while typing
+        self.poll_job = None  # the next look at what the loader has finished
         
         # Create main container for Kanban board (2/3 of width)
         self.main_frame = tk.Frame(parent)
@@ -772,16 +1436,29 @@ class KanbanBoard: #the kanban board class with all the information within
                 "low_priority": "#4ecdc4"
             },
             "dyslexia_mode": False,
-            "font_size": 12
+            "font_size": 12,
+            "storage_mode": "journal",
+            # Callbacks blocking the window for longer than this are logged (0 to turn off)
+            "slow_operation_ms": 500
         }
         
         # Load saved settings if available
         self.load_settings()
         
+        # Timings of the hot paths, shown from the Settings menu
+        self.performance_overlay = PerformanceOverlay(parent, on_close=self.performance_overlay_closed)
+        # Watches for a blocked event loop while timings are shown or a trace is recorded
+        self.heartbeat = Heartbeat(parent)
+        self.update_heartbeat()  # timing can be on from the start (KANBAN_PERF=1)
+        
         # Apply initial settings
+        self.theme = ThemeEngine()
+        self.theme.register(self.main_frame, "background", "bg")
+        self.theme.on_change(["background", "text"], self.update_pet_background)
         self.apply_settings()
         
         # Now create the rest of the UI components
+        self.quick_switcher = QuickSwitcher(self)
         self.create_menu()
         self.create_view_toggle()
         
@@ -789,6 +1466,27 @@ class KanbanBoard: #the kanban board class with all the information within
         self.todo_frame = self.create_frame("To-Do", 0, self.settings["colors"]["todo"])
         self.doing_frame = self.create_frame("Doing", 1, self.settings["colors"]["doing"])
         self.done_frame = self.create_frame("Done", 2, self.settings["colors"]["done"])
+        self.column_frames = {
+            "todo": self.todo_frame,
+            "doing": self.doing_frame,
+            "done": self.done_frame
+        }
+        self.column_views = {column: frame.task_list for column, frame in self.column_frames.items()}
+        for column, frame in self.column_frames.items():
+            self.theme.register(frame, column)
+        # Rows take their color from the priority when they are shown
+        self.theme.on_change(["high_priority", "medium_priority", "low_priority"], self.render_columns)
+        
+        # Scroll the column under the pointer with the mouse wheel. bound once on the
+        # window (CustomTkinter widgets don't allow bind_all) and removed again in close
+        if sys.platform.startswith("linux"):
+            wheel_sequences = ["<Button-4>", "<Button-5>"]
+        else:
+            wheel_sequences = ["<MouseWheel>"]
+        self.wheel_bindings = [
+            (sequence, self.root.bind_all(sequence, self.on_mouse_wheel, add="+"))
+            for sequence in wheel_sequences
+        ]
         
         # Create input area
         self.create_input_area()
@@ -796,19 +1494,64 @@ class KanbanBoard: #the kanban board class with all the information within
         # Create calendar instance
         self.calendar_view = CalendarView(parent, self)
         
-        # Store tasks
-        self.tasks = {
-            "todo": [],
-            "doing": [],
-            "done": []
-        }
+        # The tasks themselves, and saving them, are handled by the engine
+        self.engine = KanbanEngine(persistence, self.settings["storage_mode"])
         
         # Load saved tasks
         self.load_tasks()
         
+        # Log what is running whenever the window stops responding for too long
+        self.watchdog = None
+        if self.settings["slow_operation_ms"] > 0:
+            self.watchdog = Watchdog(parent, budget_ms=self.settings["slow_operation_ms"],
+                                     board_size=lambda: len(self.engine.task_index))
+            self.watchdog.start()
+        
     def show(self):
         """Show the kanban board"""
         self.main_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+    
+    def on_mouse_wheel(self, event):
+        #ask tk for the path name rather than the widget, the pointer can be over a
+        #window tkinter doesn't know (a menu, a dialog of the window manager)
+        path = str(self.root.tk.call("winfo", "containing", event.x_root, event.y_root))
+        for task_list in self.column_views.values():
+            if task_list.contains(path):
+                task_list.on_mouse_wheel(event)
+                return
+    
+    def unbind_mouse_wheel(self):
+        #unbind_all would remove every wheel binding of the window, take out only ours
+        for sequence, funcid in self.wheel_bindings:
+            script = self.root.tk.call("bind", "all", sequence)
+            kept = [line for line in str(script).split("\n") if funcid not in line]
+            self.root.tk.call("bind", "all", sequence, "\n".join(kept))
+            self.root.deletecommand(funcid)
+        self.wheel_bindings = []
+    
+    def close(self):
+        #the board is being replaced by a new one (after changing the pet): stop what
+        #runs in the background for it and write out its changes before the new board
+        #loads them
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+        self.heartbeat.stop()
+        self.performance_overlay.hide()
+        self.quick_switcher.close()
+        self.unbind_mouse_wheel()
+        # Callbacks still waiting would run against the old board
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+            self.search_job = None
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+        for task_list in self.column_views.values():
+            task_list.cancel_render()
+        persistence.flush()
+        # Closed after the flush, the writes it ran can still need the database
+        self.engine.close()
         
     def create_view_toggle(self):
         """Create a button to toggle between Kanban and Calendar views"""
@@ -825,8 +1568,83 @@ class KanbanBoard: #the kanban board class with all the information within
             corner_radius=8,
             width=200
         )
-        self.view_toggle_button.pack(pady=5)
+        self.view_toggle_button.pack(side=tk.LEFT, pady=5)
         
+        # Search box, the columns only show the tasks matching it
+        self.search_entry = ctk.CTkEntry(
+            toggle_frame,
+            width=250,
+            font=self.get_font(),
+            corner_radius=10,
+            placeholder_text="🔍 Search tasks"
+        )
+        self.search_entry.pack(side=tk.RIGHT, pady=5)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        self.search_entry.bind("<Escape>", lambda e: self.clear_search())
+        self.bind_quick_switcher(self.search_entry)
+        
+    def schedule_search(self, event=None):
+        #search once typing pauses instead of on every key
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(self.SEARCH_DELAY_MS, self.apply_search)
+    
+    @monitor.timed("search", "action")
+    def apply_search(self):
+        self.search_job = None
+        query = self.search_entry.get()
+        if query == self.search_query:
+            return
+        self.search_query = query
+        for column in ["todo", "doing", "done"]:
+            # The results start at the top of the list
+            self.column_views[column].offset = 0
+            self.refresh_column(column)
+    
+    def clear_search(self):
+        self.search_entry.delete(0, tk.END)
+        self.apply_search()
+    
+    def search_matches(self):
+        #ids of the tasks matching the search box, None while it is empty
+        return self.search_results()[0]
+    
+    def search_results(self):
+        #(matching ids, {column: matching tasks in column order}), (None, None) while the
+        #search box is empty. kept until the query or a task changes, as every column
+        #refresh needs them
+        key = (self.search_query, self.engine.search_index.version, self.engine.layout_version)
+        if self.search_cache[0] != key:
+            matches = self.engine.search(self.search_query)
+            shown = None if matches is None else self.engine.tasks_by_column(matches)
+            self.search_cache = (key, (matches, shown))
+        return self.search_cache[1]
+    
+    def open_quick_switcher(self, event=None):
+        self.quick_switcher.show()
+        return "break"
+    
+    def bind_quick_switcher(self, entry):
+        #in an entry Tk's own Ctrl+K deletes the rest of the line before the main
+        #window's binding runs, so the entry opens the switcher and stops there
+        entry.bind("<Control-k>", self.open_quick_switcher)
+        entry.bind("<Control-K>", self.open_quick_switcher)
+    
+    def show_task(self, task):
+        #bring a task into view: the board, unfiltered if the search hides the task,
+        #scrolled to its row
+        if task.id not in self.engine.task_index:
+            return  # deleted in the meantime
+        if self.calendar_view.is_visible():
+            self.toggle_view()
+            # The lists need their size to work out where to scroll to
+            self.root.update_idletasks()
+        matches = self.search_matches()
+        if matches is not None and task.id not in matches:
+            self.clear_search()
+        self.column_views[self.engine.column_of(task)].scroll_to(task)
+    
+    @monitor.timed("toggle_view", "action")
     def toggle_view(self):
         """Toggle between Kanban and Calendar views"""
         if hasattr(self.calendar_view, 'main_frame') and self.calendar_view.main_frame.winfo_ismapped():
@@ -844,14 +1662,78 @@ class KanbanBoard: #the kanban board class with all the information within
         menubar = tk.Menu(self.root)
         self.root.config(menu=menubar)
         
+        tasks_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Tasks", menu=tasks_menu)
+        tasks_menu.add_command(label="Go to Task...", accelerator="Ctrl+K", command=self.quick_switcher.show)
+        # On the main window only. entries bind it themselves (bind_quick_switcher)
+        self.root.bind("<Control-k>", self.open_quick_switcher)
+        self.root.bind("<Control-K>", self.open_quick_switcher)
+        
         settings_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Settings", menu=settings_menu)
         settings_menu.add_command(label="Customize Colors", command=self.show_color_customization_dialog)
         settings_menu.add_command(label="Toggle Dyslexia Mode", command=self.toggle_dyslexia_mode)
         settings_menu.add_command(label="Change Font Size", command=self.change_font_size)
+        
+        # Where tasks are saved
+        storage_menu = tk.Menu(settings_menu, tearoff=0)
+        settings_menu.add_cascade(label="Storage Mode", menu=storage_menu)
+        self.storage_mode_var = tk.StringVar(value=self.settings["storage_mode"])
+        for label, mode in [("JSON file", "json"), ("JSON file + journal", "journal"), ("SQLite database", "sqlite")]:
+            storage_menu.add_radiobutton(label=label, value=mode, variable=self.storage_mode_var,
+                                         command=lambda m=mode: self.set_storage_mode(m))
+        self.performance_overlay_var = tk.BooleanVar(value=False)
+        settings_menu.add_checkbutton(label="Performance Overlay", variable=self.performance_overlay_var,
+                                      command=self.toggle_performance_overlay)
+        self.tracing_var = tk.BooleanVar(value=False)
+        settings_menu.add_checkbutton(label="Record Trace", variable=self.tracing_var,
+                                      command=self.toggle_tracing)
         settings_menu.add_separator()
         settings_menu.add_command(label="Reset to Defaults", command=self.reset_settings)
         
+    def toggle_performance_overlay(self):
+        if self.performance_overlay_var.get():
+            self.performance_overlay.show()
+        else:
+            self.performance_overlay.hide()
+        self.update_heartbeat()
+    
+    def performance_overlay_closed(self):
+        self.performance_overlay_var.set(False)
+        self.update_heartbeat()
+    
+    def toggle_tracing(self):
+        #record every action, render and save as a span until tracing is switched off
+        #again, then save them as a Chrome trace
+        if self.tracing_var.get():
+            monitor.start_trace()
+            self.update_heartbeat()
+            return
+        monitor.stop_trace()
+        self.update_heartbeat()
+        path = filedialog.asksaveasfilename(
+            title="Save Trace",
+            initialfile=f"kanban_trace_{datetime.now():%Y%m%d_%H%M%S}.json",
+            defaultextension=".json",
+            filetypes=[("Chrome trace", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            count = monitor.save_trace(path)
+            messagebox.showinfo("Trace Saved", f"Saved {count} spans to {path}\n"
+                                "Open it in chrome://tracing or ui.perfetto.dev")
+        except Exception as e:
+            print(f"Error saving trace: {e}")
+            messagebox.showerror("Error", f"Could not save the trace: {e}")
+    
+    def update_heartbeat(self):
+        #the heartbeat only runs while something looks at what it finds
+        if monitor.enabled or monitor.tracing:
+            self.heartbeat.start()
+        else:
+            self.heartbeat.stop()
+    
     def create_frame(self, title, col, bg_color):
         frame = ctk.CTkFrame(
             self.main_frame,
@@ -877,16 +1759,14 @@ class KanbanBoard: #the kanban board class with all the information within
             anchor="center"
         )
         label.pack(side=tk.TOP, pady=(12, 5))
+        # The title shows how many tasks the column has
+        frame.title = title
+        frame.title_label = label
         
-        # Create a scrollable frame for tasks
-        scroll_frame = ctk.CTkScrollableFrame(
-            frame,
-            fg_color="transparent",
-            scrollbar_button_color="#8d99ae",
-            scrollbar_button_hover_color="#6c7a9e"
-        )
-        scroll_frame.pack(pady=5, padx=5, fill=tk.BOTH, expand=True)
-        frame.scroll_frame = scroll_frame
+        # Create a scrolling list for tasks (only the rows in view get widgets)
+        list_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        list_frame.pack(pady=5, padx=5, fill=tk.BOTH, expand=True)
+        frame.task_list = VirtualTaskColumn(list_frame, self, ["todo", "doing", "done"][col])
         
         if col == 0:
             move_button = ctk.CTkButton(
@@ -938,6 +1818,7 @@ class KanbanBoard: #the kanban board class with all the information within
         )
         self.entry.pack(side=tk.LEFT, padx=10, expand=True, fill=tk.X)
         self.entry.bind("<Return>", lambda e: self.add_task())
+        self.bind_quick_switcher(self.entry)
         
         # Due date input
         self.due_date_var = tk.StringVar()
@@ -980,49 +1861,40 @@ class KanbanBoard: #the kanban board class with all the information within
         )
         self.add_button.pack(side=tk.RIGHT, padx=10)
     
+    def font_family(self):
+        return self.font_registry.resolve(self.settings["dyslexia_mode"])
+    
     def get_font(self, weight="normal", size=None):
-        if size is None:
-            size = self.settings["font_size"]
-            
-        if self.settings["dyslexia_mode"]:
-            # Try to use OpenDyslexic if available
-            try:
-                # Check if OpenDyslexic is available
-                available_fonts = list(tk.font.families())
-                if "OpenDyslexic" in available_fonts:
-                    return ("OpenDyslexic", size, weight)
-                else:
-                    # Fallback to Arial if OpenDyslexic is not available
-                    return ("Arial", size, weight)
-            except:
-                # Fallback to Arial if there's an error
-                return ("Arial", size, weight)
-        else:
-            if weight == "bold":
-                return ("Calibri", size, "bold")
-            return ("Calibri", size)
+        #the shared font for a weight and size. without a size the font follows the
+        #font size setting; update_fonts reconfigures these objects in place and every
+        #widget using one of them is laid out again by Tk, nothing has to be rebuilt
+        key = (weight, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = ctk.CTkFont(
+                family=self.font_family(),
+                size=size or self.settings["font_size"],
+                weight=weight
+            )
+        return font
     
+    @monitor.timed("apply_settings", "render")
     def apply_settings(self):
-        # Apply background color
-        self.main_frame.config(bg=self.settings["colors"]["background"])
-        
-        # Update theme for customtkinter
-        ctk.set_appearance_mode("dark" if self.is_dark_color(self.settings["colors"]["background"]) else "light")
-        
-        # Update virtual pet background
+        # Only the widgets showing a color that changed are updated
+        self.theme.apply(self.settings["colors"])
+    
+    def update_pet_background(self):
         if hasattr(self, 'virtual_pet'):
             self.virtual_pet.update_pet_background()
-        
-    def is_dark_color(self, hex_color):
-        # Convert hex to RGB
-        hex_color = hex_color.lstrip('#')
-        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        
-        # Calculate luminance
-        luminance = (0.299 * r + 0.587 * g + 0.114 * b) / 255
-        return luminance < 0.5
     
+    def render_columns(self):
+        for column_view in self.column_views.values():
+            column_view.render()
+    
+    @monitor.timed("add_task", "action")
     def add_task(self):
+        if not self.board_ready():
+            return
         task_content = self.entry.get().strip()
         if not task_content:
             messagebox.showerror("Error", "Task cannot be empty")
@@ -1049,191 +1921,38 @@ class KanbanBoard: #the kanban board class with all the information within
         # Get priority
         priority = self.priority_var.get()
         
-        # Create task
-        task = Task(task_content, due_date, priority)
-        self.tasks["todo"].append(task)
+        # Create task (this also saves it)
+        self.engine.add_task(task_content, due_date, priority)
         
-        # Create task widget
-        self.create_task_widget(task, "todo")
+        # Show the task
+        self.refresh_column("todo")
+        if due_date:
+            self.calendar_view.refresh_dates({due_date})
         
         # Clear input
         self.entry.delete(0, tk.END)
         self.due_date_menu.set("No due date")
         self.priority_var.set("medium")
-        
-        # Save tasks to JSON
-        self.save_tasks()
     
-    def create_task_widget(self, task, column):
-        # Determine which frame to add to
-        if column == "todo":
-            parent = self.todo_frame.scroll_frame
-        elif column == "doing":
-            parent = self.doing_frame.scroll_frame
-        else:
-            parent = self.done_frame.scroll_frame
-        
-        # Determine priority color
-        if task.priority == "high":
-            bg_color = self.settings["colors"]["high_priority"]
-        elif task.priority == "low":
-            bg_color = self.settings["colors"]["low_priority"]
+    def refresh_column(self, column):
+        #show the current tasks of a column (only the rows in view are redrawn)
+        tasks = self.engine.tasks[column]
+        frame = self.column_frames[column]
+        matches, shown_by_column = self.search_results()
+        if matches is None:
+            title = f"{frame.title} ({len(tasks)})"
+            shown = tasks.values()
         else:
-            bg_color = self.settings["colors"]["medium_priority"]
-        
-        # Create task frame
-        task_frame = ctk.CTkFrame(
-            parent,
-            fg_color=bg_color,
-            corner_radius=10,
-            border_width=1,
-            border_color="#8d99ae"
-        )
-        task_frame.pack(pady=5, padx=5, fill=tk.X)
-        
-        # Task content
-        content_label = ctk.CTkLabel(
-            task_frame,
-            text=task.content,
-            font=self.get_font(),
-            text_color="#2b2d42",
-            wraplength=250,
-            justify="left"
-        )
-        content_label.pack(pady=5, padx=10, anchor="w")
-        
-        # Due date if exists
-        if task.due_date:
-            due_date_str = task.due_date.strftime("%Y-%m-%d")
-            due_label = ctk.CTkLabel(
-                task_frame,
-                text=f"Due: {due_date_str}",
-                font=self.get_font(),
-                text_color="#2b2d42"
-            )
-            due_label.pack(pady=2, padx=10, anchor="w")
-            
-            # Color code if task is overdue or due soon
-            today = datetime.now().date()
-            days_until_due = (task.due_date - today).days
-            if days_until_due < 0:
-                due_label.configure(text_color="#d90429", text=f"OVERDUE: {due_date_str}")
-            elif days_until_due == 0:
-                due_label.configure(text_color="#ff9e00", text=f"Due: Today")
-            elif days_until_due <= 2:
-                due_label.configure(text_color="#ff9e00", text=f"Due: {days_until_due} days")
-        
-        # Button frame
-        button_frame = ctk.CTkFrame(task_frame, fg_color="transparent")
-        button_frame.pack(pady=5, padx=5, fill=tk.X)
-        
-        # Buttons based on column
-        if column == "todo":
-            edit_btn = ctk.CTkButton(
-                button_frame,
-                text="Edit",
-                width=60,
-                font=self.get_font(size=10),
-                fg_color="#4cc9f0",
-                hover_color="#3a97b8",
-                command=lambda t=task: self.edit_task(t)
-            )
-            edit_btn.pack(side=tk.LEFT, padx=5)
-            
-            move_btn = ctk.CTkButton(
-                button_frame,
-                text="Start",
-                width=60,
-                font=self.get_font(size=10),
-                fg_color="#06d6a0",
-                hover_color="#05a181",
-                command=lambda t=task: self.move_task(t, column, "doing")
-            )
-            move_btn.pack(side=tk.LEFT, padx=5)
-            
-            delete_btn = ctk.CTkButton(
-                button_frame,
-                text="Delete",
-                width=60,
-                font=self.get_font(size=10),
-                fg_color="#ef233c",
-                hover_color="#d90429",
-                command=lambda t=task: self.delete_task(t, column)
-            )
-            delete_btn.pack(side=tk.LEFT, padx=5)
-            
-        elif column == "doing":
-            edit_btn = ctk.CTkButton(
-                button_frame,
-                text="Edit",
-                width=60,
-                font=self.get_font(size=10),
-                fg_color="#4cc9f0",
-                hover_color="#3a97b8",
-                command=lambda t=task: self.edit_task(t)
-            )
-            edit_btn.pack(side=tk.LEFT, padx=5)
-            
-            back_btn = ctk.CTkButton(
-                button_frame,
-                text="Back",
-                width=60,
-                font=self.get_font(size=10),
-                fg_color="#9d4edd",
-                hover_color="#7a3bad",
-                command=lambda t=task: self.move_task(t, column, "todo")
-            )
-            back_btn.pack(side=tk.LEFT, padx=5)
-            
-            move_btn = ctk.CTkButton(
-                button_frame,
-                text="Complete",
-                width=60,
-                font=self.get_font(size=10),
-                fg_color="#06d6a0",
-                hover_color="#05a181",
-                command=lambda t=task: self.move_task(t, column, "done")
-            )
-            move_btn.pack(side=tk.LEFT, padx=5)
-            
-            delete_btn = ctk.CTkButton(
-                button_frame,
-                text="Delete",
-                width=60,
-                font=self.get_font(size=10),
-                fg_color="#ef233c",
-                hover_color="#d90429",
-                command=lambda t=task: self.delete_task(t, column)
-            )
-            delete_btn.pack(side=tk.LEFT, padx=5)
-            
-        else:  # done column
-            back_btn = ctk.CTkButton(
-                button_frame,
-                text="Reopen",
-                width=80,
-                font=self.get_font(size=10),
-                fg_color="#9d4edd",
-                hover_color="#7a3bad",
-                command=lambda t=task: self.move_task(t, column, "doing")
-            )
-            back_btn.pack(side=tk.LEFT, padx=5)
-            
-            delete_btn = ctk.CTkButton(
-                button_frame,
-                text="Delete",
-                width=80,
-                font=self.get_font(size=10),
-                fg_color="#ef233c",
-                hover_color="#d90429",
-                command=lambda t=task: self.delete_task(t, column)
-            )
-            delete_btn.pack(side=tk.LEFT, padx=5)
-        
-        # Store reference to task frame
-        task.widget = task_frame
+            # Only the matching tasks get rows, the others are just not shown
+            shown = shown_by_column[column]
+            title = f"{frame.title} ({len(shown)}/{len(tasks)})"
+        if frame.title_label.cget("text") != title:
+            frame.title_label.configure(text=title)
+        self.column_views[column].set_tasks(shown)
     
     def edit_task(self, task):
+        if not self.board_ready():
+            return
         # Create edit dialog
         dialog = ctk.CTkToplevel(self.root)
         dialog.title("Edit Task")
@@ -1290,6 +2009,7 @@ class KanbanBoard: #the kanban board class with all the information within
         priority_menu.pack(pady=5)
         
         # Save button
+        @monitor.timed("edit_task", "action")
         def save_changes():
             new_content = content_entry.get().strip()
             if not new_content:
@@ -1305,25 +2025,14 @@ class KanbanBoard: #the kanban board class with all the information within
                     messagebox.showerror("Error", "Invalid date format. Use YYYY-MM-DD", parent=dialog)
                     return
             
-            # Update task
-            task.content = new_content
-            task.due_date = new_due_date
-            task.priority = priority_var.get()
+            # Update task (this also saves the change)
+            column, changed_dates = self.engine.edit_task(task, new_content, new_due_date, priority_var.get())
             
-            # Find which column the task is in
-            for col in ["todo", "doing", "done"]:
-                if task in self.tasks[col]:
-                    # Recreate the widget
-                    task.widget.destroy()
-                    self.create_task_widget(task, col)
-                    break
+            # Update the column the task is in
+            self.refresh_column(column)
             
-            # Update calendar if it's visible
-            if hasattr(self.calendar_view, 'main_frame') and self.calendar_view.main_frame.winfo_ismapped():
-                self.calendar_view.update_calendar()
-            
-            # Save tasks to JSON
-            self.save_tasks()
+            # Update the calendar days the task was and is due on
+            self.calendar_view.refresh_dates(changed_dates)
             
             dialog.destroy()
         
@@ -1338,54 +2047,62 @@ class KanbanBoard: #the kanban board class with all the information within
         save_btn.pack(pady=20)
     
     def move_task(self, task, from_column, to_column):
-        # Remove from current column
-        self.tasks[from_column].remove(task)
-        task.widget.destroy()
-        
-        # Add to new column
-        self.tasks[to_column].append(task)
-        self.create_task_widget(task, to_column)
-        
-        # Notify virtual pet when task is moved to done
-        if to_column == "done" and from_column != "done":
-            self.virtual_pet.task_completed()
-        
-        # Update calendar if it's visible
-        if hasattr(self.calendar_view, 'main_frame') and self.calendar_view.main_frame.winfo_ismapped():
-            self.calendar_view.update_calendar()
-        
-        # Save tasks to JSON
-        self.save_tasks()
+        self.move_tasks([task], to_column)
     
     def delete_task(self, task, column):
-        self.tasks[column].remove(task)
-        task.widget.destroy()
-        
-        # Update calendar if it's visible
-        if hasattr(self.calendar_view, 'main_frame') and self.calendar_view.main_frame.winfo_ismapped():
-            self.calendar_view.update_calendar()
+        self.delete_tasks([task])
+    
+    @monitor.timed("move_tasks", "action")
+    def move_tasks(self, tasks, to_column):
+        #move any number of tasks as one change: the engine updates and saves the board
+        #once, then the columns are redrawn once and the pet celebrates once for
+        #everything that was completed
+        if not self.board_ready():
+            return
+        changed_columns, completed = self.engine.move_tasks(tasks, to_column)
+        self.finish_bulk_change(changed_columns)
         
-        # Save tasks to JSON
-        self.save_tasks()
+        # Notify virtual pet when tasks are moved to done
+        if completed:
+            self.virtual_pet.task_completed(completed)
+    
+    @monitor.timed("delete_tasks", "action")
+    def delete_tasks(self, tasks):
+        #delete any number of tasks as one change (see move_tasks)
+        if not self.board_ready():
+            return
+        changed_columns, changed_dates = self.engine.delete_tasks(tasks)
+        self.finish_bulk_change(changed_columns, changed_dates)
+    
+    def finish_bulk_change(self, changed_columns, changed_dates=()):
+        #one layout pass for the columns that changed
+        for column in changed_columns:
+            self.refresh_column(column)
+        
+        # Update the calendar days that changed (the calendar shows every column, so
+        # moving a task leaves it as it is)
+        self.calendar_view.refresh_dates(changed_dates)
     
     def move_all_tasks(self, from_column, to_column):
-        if not self.tasks[from_column]:
+        if not self.board_ready():
+            return
+        if not self.engine.tasks[from_column]:
             messagebox.showinfo("Info", f"No tasks to move from {from_column}")
             return
             
         # Move all tasks
-        for task in self.tasks[from_column][:]:  # Use slice to copy list
-            self.move_task(task, from_column, to_column)
+        self.move_tasks(list(self.engine.tasks[from_column].values()), to_column)
     
     def clear_all_tasks(self, column):
-        if not self.tasks[column]:
+        if not self.board_ready():
+            return
+        if not self.engine.tasks[column]:
             messagebox.showinfo("Info", f"No tasks to clear from {column}")
             return
             
         # Confirm deletion
         if messagebox.askyesno("Confirm", f"Are you sure you want to clear all tasks from {column}?"):
-            for task in self.tasks[column][:]:  # Use slice to copy list
-                self.delete_task(task, column)
+            self.delete_tasks(list(self.engine.tasks[column].values()))
     
     def show_color_customization_dialog(self):
         dialog = ctk.CTkToplevel(self.root)
@@ -1406,6 +2123,7 @@ class KanbanBoard: #the kanban board class with all the information within
             text_color=self.settings["colors"]["text"]
         )
         title_label.pack(pady=10)
+        self.theme.register(title_label, "text", "text_color")
         
         # Color options with dropdowns
         color_options = [
@@ -1434,6 +2152,7 @@ class KanbanBoard: #the kanban board class with all the information within
                 anchor="w"
             )
             label.pack(side=tk.LEFT, padx=5)
+            self.theme.register(label, "text", "text_color")
             # Current color display
             color_display = ctk.CTkFrame(
                 option_frame, 
@@ -1445,30 +2164,24 @@ class KanbanBoard: #the kanban board class with all the information within
                 border_color="#8d99ae"
             )
             color_display.pack(side=tk.LEFT, padx=5)
+            self.theme.register(color_display, color_key)
             # Color selection button
-            def make_color_callback(key, display):
+            def make_color_callback(key):
                 def callback():
                     color = colorchooser.askcolor(initialcolor=self.settings["colors"][key])[1]
                     if color:
-                        self.settings["colors"][key] = color
-                        display.configure(fg_color=color)
-                        self.apply_settings()
-                        self.update_frame_colors()
-                        # Update task widgets if priority colors changed
-                        if key in ["high_priority", "medium_priority", "low_priority"]:
-                            for column in ["todo", "doing", "done"]:
-                                for task in self.tasks[column]:
-                                    if task.priority == key.split('_')[0]:
-                                        task.widget.configure(fg_color=color)
-                                        
-                        self.save_settings()
+                        # Timed from here, the time spent in the color chooser doesn't count
+                        with monitor.span("change_color", "action", {"color": key}):
+                            self.settings["colors"][key] = color
+                            self.apply_settings()
+                            self.save_settings()
                 return callback
             color_btn = ctk.CTkButton(
                 option_frame,
                 text="Choose Color",
                 width=100,
                 font=self.get_font(),
-                command=make_color_callback(color_key, color_display)
+                command=make_color_callback(color_key)
             )
             color_btn.pack(side=tk.LEFT, padx=5)
         # Close button
@@ -1482,24 +2195,17 @@ class KanbanBoard: #the kanban board class with all the information within
         )
         close_btn.pack(pady=20)
     
-    def update_frame_colors(self):
-        self.todo_frame.configure(fg_color=self.settings["colors"]["todo"])
-        self.doing_frame.configure(fg_color=self.settings["colors"]["doing"])
-        self.done_frame.configure(fg_color=self.settings["colors"]["done"])
-    
     def toggle_dyslexia_mode(self):
         self.settings["dyslexia_mode"] = not self.settings["dyslexia_mode"]
         
-        # Check if OpenDyslexic font is available
-        try:
-            available_fonts = list(tk.font.families())
-            if self.settings["dyslexia_mode"] and "OpenDyslexic" not in available_fonts:
+        # Check if OpenDyslexic font is available, it may have been installed since startup
+        if self.settings["dyslexia_mode"] and not self.font_registry.is_available("OpenDyslexic"):
+            self.font_registry.refresh()
+            if not self.font_registry.is_available("OpenDyslexic"):
                 messagebox.showwarning("Font Not Available", 
                                       "OpenDyslexic font is not installed on your system. "
                                       "Please install it for the best dyslexia-friendly experience. "
                                       "Using Arial as fallback.")
-        except:
-            pass
             
         self.update_fonts()
         self.save_settings()
@@ -1520,28 +2226,19 @@ class KanbanBoard: #the kanban board class with all the information within
             self.save_settings()
     
     def update_fonts(self):
-        # Update all widgets with new font settings
-        font = self.get_font()
-        bold_font = self.get_font("bold")
-        
-        # Update frames
-        for frame in [self.todo_frame, self.doing_frame, self.done_frame]:
-            for widget in frame.winfo_children():
-                if isinstance(widget, ctk.CTkLabel):
-                    widget.configure(font=bold_font)
-        
-        # Update input area
-        self.entry.configure(font=font)
-        self.due_date_menu.configure(font=font, dropdown_font=font)
-        self.add_button.configure(font=bold_font)
-        
-        # Recreate all task widgets to update fonts
-        for column in ["todo", "doing", "done"]:
-            for task in self.tasks[column]:
-                task.widget.destroy()
-                self.create_task_widget(task, column)
+        # Reconfigure the shared fonts, the widgets using them follow
+        family = self.font_family()
+        for (weight, size), font in self.fonts.items():
+            font.configure(family=family, size=size or self.settings["font_size"])
+        
+        # Rows are as high as their text, measure them again
+        for column_view in self.column_views.values():
+            column_view.relayout()
     
     def reset_settings(self):
+        # Where tasks are stored and the slow operation log are not display settings, keep them
+        storage_mode = self.settings["storage_mode"]
+        slow_operation_ms = self.settings["slow_operation_ms"]
         self.settings = {
             "colors": {
                 "todo": "#707699",
@@ -1554,93 +2251,124 @@ class KanbanBoard: #the kanban board class with all the information within
                 "low_priority": "#4ecdc4"
             },
             "dyslexia_mode": False,
-            "font_size": 12
+            "font_size": 12,
+            "storage_mode": storage_mode,
+            "slow_operation_ms": slow_operation_ms
         }
         self.apply_settings()
-        self.update_frame_colors()
-        # Recreate all task widgets to update colors
-        for column in ["todo", "doing", "done"]:
-            for task in self.tasks[column]:
-                task.widget.destroy()
-                self.create_task_widget(task, column)          
         self.update_fonts()
         self.save_settings()
         messagebox.showinfo("Settings Reset", "All settings have been reset to defaults")
     
+    def set_storage_mode(self, mode):
+        #switch where tasks are saved, taking the current board along
+        if mode == self.settings["storage_mode"]:
+            return
+        if not self.board_ready():
+            self.storage_mode_var.set(self.settings["storage_mode"])
+            return
+        try:
+            self.engine.set_storage_mode(mode)
+        except Exception as e:
+            print(f"Error switching storage mode: {e}")
+            messagebox.showerror("Error", f"Could not switch storage mode: {e}")
+            self.storage_mode_var.set(self.settings["storage_mode"])
+            return
+        self.settings["storage_mode"] = mode
+        self.save_settings()
+    
     def load_settings(self):
         #load settings that have been set from previous times (such as color, font size)
         try:
-            if os.path.exists("kanban_settings.json"):
-                with open("kanban_settings.json", "r") as f:
-                    loaded_settings = json.load(f)
-                    # Merge with default settings to ensure all keys exist
-                    for key in self.settings:
-                        if key in loaded_settings:
-                            if isinstance(self.settings[key], dict):
-                                self.settings[key].update(loaded_settings[key])
-                            else:
-                                self.settings[key] = loaded_settings[key]
+            loaded_settings = load_json_file("kanban_settings.json")
+            if loaded_settings is not None:
+                # Merge with default settings to ensure all keys exist
+                for key in self.settings:
+                    if key in loaded_settings:
+                        if isinstance(self.settings[key], dict):
+                            self.settings[key].update(loaded_settings[key])
+                        else:
+                            self.settings[key] = loaded_settings[key]
         except Exception as e:
             print(f"Error loading settings: {e}")
     
     def save_settings(self):
-        try:
-            with open("kanban_settings.json", "w") as f:
-                json.dump(self.settings, f, indent=4)
-        except Exception as e:
-            print(f"Error saving settings: {e}")
+        # Copy, so later changes don't leak into a save that is still pending
+        data = copy.deepcopy(self.settings)
+        
+        def write():
+            try:
+                save_json_file("kanban_settings.json", data)
+            except Exception as e:
+                print(f"Error saving settings: {e}")
+        persistence.schedule("settings", write)
     
     def load_tasks(self):
-        #Load previously written tasks from JSON file
-        try:
-            if os.path.exists("kanban_tasks.json"):
-                with open("kanban_tasks.json", "r") as f:
-                    tasks_data = json.load(f)
-                    
-                    # Clear existing tasks
-                    self.tasks = {"todo": [], "doing": [], "done": []}
-                    
-                    # Load tasks for each column
-                    for column in ["todo", "doing", "done"]:
-                        if column in tasks_data:
-                            for task_dict in tasks_data[column]:
-                                try:
-                                    task = Task.from_dict(task_dict)
-                                    self.tasks[column].append(task)
-                                    # Create the task widget
-                                    self.create_task_widget(task, column)
-                                except Exception as e:
-                                    print(f"Error loading task: {e}")
-                                    continue
-                    
-                print(f"Loaded {len(self.tasks['todo'])} todo, {len(self.tasks['doing'])} doing, {len(self.tasks['done'])} done tasks")
-            else:
-                print("No saved tasks found")
-        except Exception as e:
-            print(f"Error loading tasks: {e}")
+        #load the saved board. the file is read and parsed on a loader thread while the
+        #window is set up, and the columns fill in as the tasks arrive
+        self.load_queue = self.engine.start_loading()
+        if self.load_queue is None:
+            # The database was loaded right away
+            self.finish_loading_tasks()
+            return
+        self.poll_loaded_tasks()
     
-    def save_tasks(self):
-        #Save tasks to JSON file
-        try:
-            tasks_data = {
-                "todo": [task.to_dict() for task in self.tasks["todo"]],
-                "doing": [task.to_dict() for task in self.tasks["doing"]],
-                "done": [task.to_dict() for task in self.tasks["done"]]
-            }
-            with open("kanban_tasks.json", "w") as f:
-                json.dump(tasks_data, f, indent=4, default=str)
-            
-            print(f"Saved {len(self.tasks['todo'])} todo, {len(self.tasks['doing'])} doing, {len(self.tasks['done'])} done tasks")
-        except Exception as e:
-            print(f"Error saving tasks: {e}")
+    def poll_loaded_tasks(self):
+        #take what the loader has finished, for a few milliseconds at most, then give the
+        #window time to paint and handle input before looking again
+        self.poll_job = None
+        changed_columns = set()
+        deadline = time.perf_counter() + 0.01
+        while self.engine.loading and time.perf_counter() < deadline:
+            try:
+                item = self.load_queue.get_nowait()
+            except queue.Empty:
+                break
+            column = self.engine.add_loaded(item)
+            if column:
+                changed_columns.add(column)
+        
+        if not self.engine.loading:
+            self.load_queue = None
+            self.finish_loading_tasks()
+            return
+        for column in changed_columns:
+            self.refresh_column(column)
+        self.poll_job = self.root.after(20, self.poll_loaded_tasks)
+    
+    def finish_loading_tasks(self):
+        # Replaying the journal can have moved tasks, show every column as it is now
+        for column in ["todo", "doing", "done"]:
+            self.refresh_column(column)
+        if self.calendar_view.is_visible():
+            self.calendar_view.update_calendar()
+    
+    def board_ready(self):
+        #changes wait until the saved board is loaded, or a save could overwrite it
+        if self.engine.loading:
+            messagebox.showinfo("Loading", "Your tasks are still loading, try again in a moment")
+            return False
+        return True
 
-# Create the virtual pet application
-try:
-    virtual_pet = VirtualPet(root)
-    print("Application started successfully")
-except Exception as e:
-    print(f"Error starting application: {e}")
-    messagebox.showerror("Error", f"Failed to start application: {e}")
+# Background writer for tasks, settings and pet stats
+persistence = PersistenceService()
 
-# Start the application
-root.mainloop()
+def close_application():
+    #write anything still pending before the window goes away
+    persistence.close()
+    root.destroy()
+
+# Started as a program (benchmark.py imports this module to time the widgets)
+if __name__ == "__main__":
+    root.protocol("WM_DELETE_WINDOW", close_application)
+    
+    # Create the virtual pet application
+    try:
+        virtual_pet = VirtualPet(root)
+        print("Application started successfully")
+    except Exception as e:
+        print(f"Error starting application: {e}")
+        messagebox.showerror("Error", f"Failed to start application: {e}")
+    
+    # Start the application
+    root.mainloop()
@@ -0,0 +1,431 @@
+"""Benchmarks for the task manager at realistic board sizes.
+
+Times loading, saving, changing and querying a board through kanban_engine (no display
+needed) and, with --gui, the widget paths of Iteration_4.py (building the board,
+scrolling the columns, update_fonts and the calendar) under a virtual X server.
+Every path is timed (best of --repeat runs) and then run once more under tracemalloc
+for its peak memory. The memory a board's tasks take is reported as bytes per task,
+next to the task layout used before Task had __slots__. Results are saved as JSON, so
+a later run can be compared to them:
+
+    python benchmark.py --sizes 1000 100000 --output before.json
+    python benchmark.py --sizes 1000 100000 --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from kanban_engine import COLUMNS, KanbanEngine, PersistenceService, Task, save_json_file
+
+WORDS = ["write", "report", "email", "review", "plan", "call", "fix", "update", "read",
+         "notes", "homework", "groceries", "meeting", "budget", "draft", "slides"]
+
+def generate_board(size, seed=0):
+    #a board of size tasks shaped like a real one: half still to do, a third done and
+    #the rest in progress. about a third has no due date, the others cluster around
+    #the coming week with a tail of overdue and far off dates. medium priority is the
+    #most common
+    rng = random.Random(seed)
+    today = date.today()
+    columns = {column: [] for column in COLUMNS}
+    placements = rng.choices(COLUMNS, weights=[50, 15, 35], k=size)
+    priorities = rng.choices(["low", "medium", "high"], weights=[30, 50, 20], k=size)
+    for i in range(size):
+        due_date = None
+        if rng.random() < 0.65:
+            due_date = today + timedelta(days=round(rng.triangular(-30, 90, 7)))
+        content = f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} #{i}"
+        columns[placements[i]].append(Task(content, due_date, priorities[i]))
+    return columns
+
+def write_board(columns, path):
+    #save a generated board the way the app does
+    data = {column: [task.to_dict() for task in columns[column]] for column in COLUMNS}
+    data["next_id"] = Task.next_id
+    save_json_file(path, data, backups=0)
+
+def quiet():
+    #the engine reports every load and save, which would drown the results
+    return contextlib.redirect_stdout(io.StringIO())
+
+class Benchmark:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, name, size, setup, items=None):
+        #setup() prepares a fresh run and returns the function to time. the fastest of
+        #the timed runs is kept; one more run under tracemalloc gives the peak memory
+        #(Python allocations only, Tk's own memory is not seen)
+        times = []
+        for _ in range(self.repeat):
+            run = setup()
+            gc.collect()
+            with quiet():
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+        run = setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with quiet():
+                run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        seconds = min(times)
+        items = size if items is None else items
+        rate = items / seconds if seconds > 0 else None
+        self.results.append({
+            "name": name,
+            "size": size,
+            "seconds": seconds,
+            "items": items,
+            "items_per_second": rate,
+            "peak_memory": peak
+        })
+        rate_text = f"{rate:14,.0f}/s" if rate else f"{'-':>16}"
+        print(f"{name:<22}{size:>10,}{seconds * 1000:12.2f} ms{rate_text}{peak / 2**20:10.1f} MiB")
+
+    def measure_memory(self, name, size, build):
+        #build() makes size objects and returns them; what is still allocated while they
+        #are alive (the objects and everything they own) is reported per object
+        gc.collect()
+        tracemalloc.start()
+        try:
+            objects = build()
+            current = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        del objects
+        self.results.append({
+            "name": name,
+            "size": size,
+            "bytes_per_task": current / size
+        })
+        print(f"{name:<22}{size:>10,}{current / size:12.1f} B/task")
+
+class PlainTask:
+    #the task layout from before Task had __slots__: a per-task __dict__ holding the
+    #priority as a string and the due date as a date object. only kept here, to show
+    #what the slimmer Task saves
+    def __init__(self, content, due_date, priority, task_id):
+        self.content = content
+        self.due_date = due_date
+        self.priority = priority
+        self.id = task_id
+
+def benchmark_task_memory(bench, size):
+    #bytes per task of a generated board, in the current and in the old layout. the
+    #texts and dates are made inside the measurement, as loading a board makes them
+    rows = [(task.content, task.due_ordinal, task.priority, task.id)
+            for column in generate_board(size).values() for task in column]
+    def build(task_class):
+        return lambda: [task_class("".join(content), date.fromordinal(ordinal) if ordinal else None,
+                                   priority, task_id)
+                        for content, ordinal, priority, task_id in rows]
+    bench.measure_memory("task_memory", size,
+                         build(lambda *args: Task(*args, reserve=False)))
+    bench.measure_memory("task_memory_plain", size, build(PlainTask))
+
+def benchmark_engine(bench, size, folder):
+    board_folder = os.path.join(folder, "board")
+    os.mkdir(board_folder)
+    write_board(generate_board(size), os.path.join(board_folder, "kanban_tasks.json"))
+    # Writes only happen when flush() is called, inside the timed runs
+    persistence = PersistenceService(quiet_period=3600)
+    runs = []
+
+    def cleanup():
+        for board_engine, run_folder in runs:
+            board_engine.close()
+            shutil.rmtree(run_folder)
+        runs.clear()
+
+    def engine(mode, load=True, source=board_folder):
+        #a board engine on its own copy of the generated board, so what one run
+        #changes doesn't carry over into the next
+        cleanup()
+        run_folder = os.path.join(folder, "run")
+        shutil.copytree(source, run_folder)
+        board_engine = KanbanEngine(persistence, mode,
+                                    tasks_path=os.path.join(run_folder, "kanban_tasks.json"),
+                                    journal_path=os.path.join(run_folder, "kanban_tasks.journal"),
+                                    database_path=os.path.join(run_folder, "kanban_tasks.db"))
+        runs.append((board_engine, run_folder))
+        if load:
+            with quiet():
+                board_engine.load()
+        return board_engine
+
+    try:
+        bench.measure("load_json", size, lambda: engine("json", load=False).load)
+
+        # The database is created from the JSON file on the first load in sqlite mode;
+        # do that once and keep it with the board for the runs below
+        board_engine = engine("sqlite")
+        counts = {column: len(board_engine.tasks[column]) for column in COLUMNS}
+        board_engine.close()
+        shutil.copy(os.path.join(runs[0][1], "kanban_tasks.db"), board_folder)
+        bench.measure("load_sqlite", size, lambda: engine("sqlite", load=False).load)
+
+        def save():
+            board_engine = engine("json")
+            def run():
+                board_engine.save_tasks()
+                persistence.flush()
+            return run
+        bench.measure("save_json", size, save)
+
+        for mode in ["json", "journal", "sqlite"]:
+            def add_tasks(mode=mode):
+                #a thousand single changes, each saved the way the storage mode saves it
+                board_engine = engine(mode)
+                due_date = date.today()
+                def run():
+                    for i in range(1000):
+                        board_engine.add_task(f"New task {i}", due_date, "high")
+                    persistence.flush()
+                return run
+            bench.measure(f"add_1000_{mode}", size, add_tasks, items=1000)
+
+        def move_column():
+            board_engine = engine("journal")
+            tasks = list(board_engine.tasks["todo"].values())
+            def run():
+                board_engine.move_tasks(tasks, "doing")
+                persistence.flush()
+            return run
+        bench.measure("move_column", size, move_column, items=max(1, counts["todo"]))
+
+        def delete_column():
+            board_engine = engine("journal")
+            tasks = list(board_engine.tasks["done"].values())
+            def run():
+                board_engine.delete_tasks(tasks)
+                persistence.flush()
+            return run
+        bench.measure("delete_column", size, delete_column, items=max(1, counts["done"]))
+
+        board_engine = engine("json")
+        today = date.today()
+        months = [((today.month - 1 + offset) % 12 + 1, today.year + (today.month - 1 + offset) // 12)
+                  for offset in range(-1, 11)]
+        def calendar_months():
+            for month, year in months:
+                board_engine.due_index.in_month(year, month)
+        bench.measure("calendar_12_months", size, lambda: calendar_months, items=12)
+        bench.measure("overdue", size, lambda: board_engine.due_index.overdue, items=1)
+        # Search as you type: every prefix of the query, the way the search box sees it,
+        # including putting the matches of each column in order
+        query = "read notes"
+        def search_typing():
+            for end in range(1, len(query) + 1):
+                board_engine.tasks_by_column(board_engine.search(query[:end]))
+        bench.measure("search_typing", size, lambda: search_typing, items=len(query))
+        # The quick switcher, with the typos it is there for
+        bench.measure("find_similar", size, lambda: lambda: board_engine.find_similar("raed ntoes"), items=1)
+    finally:
+        persistence.close()
+        cleanup()
+
+def start_display():
+    #use the display we were started on, or start a virtual X server. returns the
+    #server process to stop afterwards (None if a display was already there)
+    if os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise RuntimeError("no DISPLAY and Xvfb is not installed")
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen(
+        [xvfb, "-displayfd", str(write_fd), "-screen", "0", "1600x1000x24", "-nolisten", "tcp"],
+        pass_fds=[write_fd], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    # Xvfb writes the display number it picked once it is ready
+    with os.fdopen(read_fd) as pipe:
+        number = pipe.readline().strip()
+    if not number:
+        server.kill()
+        raise RuntimeError("Xvfb did not start")
+    os.environ["DISPLAY"] = f":{number}"
+    return server
+
+class PetStub:
+    #stands in for VirtualPet, the board only tells it about finished tasks
+    def task_completed(self, count=1):
+        pass
+
+    def update_pet_background(self):
+        pass
+
+def benchmark_gui(bench, size, folder):
+    board = generate_board(size)
+    write_board(board, os.path.join(folder, "kanban_tasks.json"))
+    del board
+
+    # The app saves and loads next to where it runs; importing it creates the window
+    os.chdir(folder)
+    with quiet():
+        import Iteration_4 as app
+    root = app.root
+    root.geometry("1400x800")
+    current = {}
+
+    def destroy_board():
+        board = current.pop("board", None)
+        if board is not None:
+            board.close()
+            board.main_frame.destroy()
+            board.calendar_view.main_frame.destroy()
+            root.update()
+
+    def build_board():
+        destroy_board()
+        def run():
+            board = app.KanbanBoard(root, PetStub())
+            board.show()
+            # The tasks arrive from the loader thread while the event loop runs
+            while board.engine.loading:
+                root.update()
+                time.sleep(0.001)
+            root.update()
+            current["board"] = board
+        return run
+
+    try:
+        bench.measure("gui_load", size, build_board)
+        board = current["board"]
+
+        def scroll():
+            #page through each column top to bottom
+            for column_view in board.column_views.values():
+                for step in range(21):
+                    column_view.yview("moveto", step / 20)
+                    root.update_idletasks()
+        bench.measure("gui_scroll", size, lambda: scroll, items=63)
+
+        def update_fonts():
+            board.update_fonts()
+            root.update_idletasks()
+        bench.measure("gui_update_fonts", size, lambda: update_fonts, items=1)
+
+        board.toggle_view()
+        root.update()
+        def update_calendar():
+            board.calendar_view.update_calendar()
+            root.update_idletasks()
+        bench.measure("gui_calendar", size, lambda: update_calendar, items=1)
+
+        def change_months():
+            for delta in [1] * 6 + [-1] * 6:
+                board.calendar_view.change_calendar_month(delta)
+                root.update_idletasks()
+        bench.measure("gui_calendar_months", size, lambda: change_months, items=12)
+    finally:
+        destroy_board()
+        app.persistence.flush()
+
+def compare(results, baseline_path, threshold):
+    #print how every result changed against an earlier run, returns the number of
+    #results that got slower by more than threshold
+    with open(baseline_path, "r") as f:
+        baseline = {(result["name"], result["size"]): result for result in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nCompared to {baseline_path}:")
+    for result in results:
+        old = baseline.get((result["name"], result["size"]))
+        if old is not None and "bytes_per_task" in result and old.get("bytes_per_task"):
+            # A memory result: more bytes per task is the regression
+            change = result["bytes_per_task"] / old["bytes_per_task"] - 1
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{result['name']:<22}{result['size']:>10,}{old['bytes_per_task']:12.1f} B  ->"
+                  f"{result['bytes_per_task']:10.1f} B  {change:+8.1%}{flag}")
+            continue
+        if old is None or not old.get("seconds"):
+            continue
+        change = result["seconds"] / old["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{result['name']:<22}{result['size']:>10,}{old['seconds'] * 1000:12.2f} ms ->"
+              f"{result['seconds'] * 1000:10.2f} ms {change:+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="board sizes in tasks (default: 1000 10000 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per path (default: 3)")
+    parser.add_argument("--gui", action="store_true",
+                        help="also time the widget paths (uses $DISPLAY or starts Xvfb)")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to save the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown that counts as a regression (default: 0.10)")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    bench = Benchmark(args.repeat)
+    server = None
+    if args.gui:
+        # Find out about a missing display before spending time on the other paths
+        try:
+            server = start_display()
+        except RuntimeError as e:
+            parser.error(f"--gui needs a display: {e}")
+    print(f"{'path':<22}{'tasks':>10}{'time':>15}{'throughput':>16}{'peak':>14}")
+    working_folder = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix="kanban-bench-") as folder:
+            for size in args.sizes:
+                size_folder = os.path.join(folder, str(size))
+                os.mkdir(size_folder)
+                benchmark_engine(bench, size, size_folder)
+                benchmark_task_memory(bench, size)
+            if args.gui:
+                for size in args.sizes:
+                    size_folder = os.path.join(folder, f"gui-{size}")
+                    os.mkdir(size_folder)
+                    benchmark_gui(bench, size, size_folder)
+                os.chdir(working_folder)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    with open(output, "w") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "results": bench.results
+        }, f, indent=4)
+    print(f"\nSaved results to {output}")
+
+    if baseline and compare(bench.results, baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
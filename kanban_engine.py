@@ -0,0 +1,1158 @@
+"""Board engine for the task manager: the tasks, their columns, the indexes over them
+and saving/loading, without any widgets.
+
+Iteration_4.py draws the board and drives this engine, but it works just as well on its
+own (scripts, benchmarks, services), as it only needs the standard library.
+"""
+import json
+import os
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, date
+from enum import Enum
+from calendar import monthrange
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nlargest
+from perf_monitor import monitor
+
+class Priority(Enum):
+    #task priorities. every task points at one of these shared members
+    #instead of carrying its own string
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+
+class Task: #the task class with the info
+    #boards can hold a lot of old tasks, so tasks are kept small: __slots__ instead of
+    #a per-task __dict__, the priority as a Priority member and the due date as a date
+    #ordinal (0 for no due date). the widget showing a task is not stored on the task,
+    #each column keeps the rows in view by task id (VirtualTaskColumn.visible_rows)
+    __slots__ = ("content", "due_ordinal", "_priority", "id")
+    
+    #ids come from a counter that is saved with the board, so they stay unique
+    #across sessions (unlike id(self), which Python reuses for new objects). the
+    #loader thread builds tasks too, so the counter is only changed under a lock
+    next_id = 1
+    id_lock = threading.Lock()
+    
+    def __init__(self, content, due_date=None, priority="medium", task_id=None, reserve=True):
+        #reserve=False leaves the id counter alone, the caller takes care of it
+        self.content = content
+        self.due_date = due_date
+        self.priority = priority
+        if task_id is None:
+            task_id = Task.new_id()
+        elif reserve:
+            Task.reserve_id(task_id)
+        self.id = task_id
+    
+    @property
+    def due_date(self):
+        return date.fromordinal(self.due_ordinal) if self.due_ordinal else None
+    
+    @due_date.setter
+    def due_date(self, value):
+        self.due_ordinal = value.toordinal() if value else 0
+    
+    @property
+    def priority(self):
+        return self._priority.value
+    
+    @priority.setter
+    def priority(self, value):
+        try:
+            self._priority = Priority(value)
+        except ValueError:
+            self._priority = Priority.MEDIUM
+    
+    @classmethod
+    def new_id(cls):
+        with cls.id_lock:
+            task_id = cls.next_id
+            cls.next_id += 1
+        return task_id
+    
+    @classmethod
+    def reserve_id(cls, task_id):
+        #make sure new tasks never get an id that is (or was) already in use
+        if isinstance(task_id, int):
+            with cls.id_lock:
+                if task_id >= cls.next_id:
+                    cls.next_id = task_id + 1
+    
+    def to_dict(self):
+        #converts task to dictionary for JSON serialization
+        return {
+            "content": self.content,
+            "due_date": self.due_date.isoformat() if self.due_date else None,
+            "priority": self.priority,
+            "id": self.id
+        }
+    
+    @classmethod
+    def from_dict(cls, data, reserve=True):
+        #creates task from dictionary
+        due_date = datetime.fromisoformat(data["due_date"]).date() if data["due_date"] else None
+        return cls(data["content"], due_date, data["priority"], data["id"], reserve)
+
+class DueDateIndex:
+    #the tasks that have a due date, kept sorted by due date (whatever column they are
+    #in) so the tasks of a month, a week or everything overdue are found with a binary
+    #search instead of by going through the whole board
+    def __init__(self):
+        self.keys = []  #sorted (due_ordinal, task id)
+        self.tasks = {}  #task id -> task
+        self.ordinals = {}  #task id -> the due_ordinal the task is filed under
+    
+    def rebuild(self, tasks):
+        #index these tasks from scratch (sorting once is cheaper than adding one by one)
+        self.tasks = {task.id: task for task in tasks if task.due_ordinal}
+        self.ordinals = {task_id: task.due_ordinal for task_id, task in self.tasks.items()}
+        self.keys = sorted((ordinal, task_id) for task_id, ordinal in self.ordinals.items())
+    
+    def add(self, task):
+        if not task.due_ordinal:
+            return
+        insort(self.keys, (task.due_ordinal, task.id))
+        self.tasks[task.id] = task
+        self.ordinals[task.id] = task.due_ordinal
+    
+    def remove(self, task):
+        ordinal = self.ordinals.pop(task.id, None)
+        if ordinal is None:
+            return
+        del self.tasks[task.id]
+        del self.keys[bisect_left(self.keys, (ordinal, task.id))]
+    
+    def remove_many(self, tasks):
+        #removing one by one shifts the list every time, for a lot of tasks filter it once
+        tasks = list(tasks)
+        if len(tasks) < 64:
+            for task in tasks:
+                self.remove(task)
+            return
+        for task in tasks:
+            if self.ordinals.pop(task.id, None) is not None:
+                del self.tasks[task.id]
+        self.keys = [key for key in self.keys if key[1] in self.tasks]
+    
+    def update(self, task):
+        #file a task again after its due date changed
+        self.remove(task)
+        self.add(task)
+    
+    def between(self, start, end):
+        #tasks due from start to end (both dates included), earliest first
+        low = bisect_left(self.keys, (start.toordinal(),))
+        high = bisect_left(self.keys, (end.toordinal() + 1,))
+        return [self.tasks[task_id] for _, task_id in self.keys[low:high]]
+    
+    def in_month(self, year, month):
+        return self.between(date(year, month, 1), date(year, month, monthrange(year, month)[1]))
+    
+    def in_week(self, day):
+        #the week (Sunday to Saturday, like the calendar) that day is in
+        start = day - timedelta(days=(day.weekday() + 1) % 7)
+        return self.between(start, start + timedelta(days=6))
+    
+    def overdue(self, today=None):
+        #tasks due before today, earliest first
+        today = today or date.today()
+        high = bisect_left(self.keys, (today.toordinal(),))
+        return [self.tasks[task_id] for _, task_id in self.keys[:high]]
+
+class SearchIndex:
+    #an inverted index over the task descriptions: every word points at the ids of the
+    #tasks using it, so a search intersects a few sets instead of reading every task.
+    #a task matches when it has all the words of the query, the last one also counting
+    #as the start of a word (so results show up while the word is still being typed)
+    WORD = re.compile(r"\w+")
+    
+    def __init__(self):
+        self.postings = {}  #word -> ids of the tasks using it
+        self.words = {}  #task id -> the words of the task
+        self.sorted_words = []  #every indexed word, sorted (for the prefix search)
+        self.sorted = True  #False after a bulk change, sorted_words is sorted again when needed
+        self.version = 0  #goes up with every change, so results can be cached
+    
+    @classmethod
+    def tokenize(cls, text):
+        return cls.WORD.findall(text.lower())
+    
+    def rebuild(self, tasks):
+        #index these tasks from scratch
+        self.postings = {}
+        self.words = {}
+        self.add_many(tasks)
+    
+    def add_many(self, tasks):
+        #index a batch of tasks (e.g. while loading), the word list is sorted later
+        postings = self.postings
+        for task in tasks:
+            words = frozenset(self.tokenize(task.content))
+            self.words[task.id] = words
+            for word in words:
+                ids = postings.get(word)
+                if ids is None:
+                    ids = postings[word] = set()
+                ids.add(task.id)
+        self.sorted = False
+        self.version += 1
+    
+    def add(self, task):
+        words = frozenset(self.tokenize(task.content))
+        self.words[task.id] = words
+        for word in words:
+            ids = self.postings.get(word)
+            if ids is None:
+                ids = self.postings[word] = set()
+                if self.sorted:
+                    insort(self.sorted_words, word)
+            ids.add(task.id)
+        self.version += 1
+    
+    def remove(self, task):
+        words = self.words.pop(task.id, None)
+        if words is None:
+            return
+        for word in words:
+            ids = self.postings[word]
+            ids.discard(task.id)
+            if not ids:
+                del self.postings[word]
+                if self.sorted:
+                    del self.sorted_words[bisect_left(self.sorted_words, word)]
+        self.version += 1
+    
+    def remove_many(self, tasks):
+        for task in tasks:
+            self.remove(task)
+    
+    def update(self, task):
+        #index a task again after its description changed
+        if self.words.get(task.id) != frozenset(self.tokenize(task.content)):
+            self.remove(task)
+            self.add(task)
+    
+    def sort_words(self):
+        if not self.sorted:
+            self.sorted_words = sorted(self.postings)
+            self.sorted = True
+    
+    def words_starting_with(self, prefix):
+        self.sort_words()
+        index = bisect_left(self.sorted_words, prefix)
+        words = []
+        while index < len(self.sorted_words) and self.sorted_words[index].startswith(prefix):
+            words.append(self.sorted_words[index])
+            index += 1
+        return words
+    
+    def search(self, query):
+        #ids of the tasks matching query, None when the query has no words (no filter)
+        words = self.tokenize(query)
+        if not words:
+            return None
+        prefix = words.pop()
+        # Intersect starting from the rarest word, the result only gets smaller
+        matches = None
+        for word in sorted(set(words), key=lambda word: len(self.postings.get(word, ()))):
+            ids = self.postings.get(word)
+            if not ids:
+                return set()
+            matches = set(ids) if matches is None else matches & ids
+            if not matches:
+                return matches
+        
+        completions = self.words_starting_with(prefix)
+        if matches is None:
+            return set().union(*[self.postings[word] for word in completions])
+        if len(completions) < len(matches):
+            # Few words start with the prefix: intersect their tasks with the matches
+            found = set()
+            for word in completions:
+                found |= matches & self.postings[word]
+            return found
+        # Few tasks are left: check their words
+        return {task_id for task_id in matches
+                if any(word.startswith(prefix) for word in self.words[task_id])}
+
+class TrigramIndex:
+    #every run of three characters ("trigram") of the task descriptions points at the
+    #tasks containing it, for finding tasks by a query with typos in it: a task that
+    #shares most of the query's trigrams is a good match even if no word is spelled
+    #the same. only the description text is kept per task (the string the task already
+    #holds), its trigrams are worked out again when they are needed
+    CANDIDATE_WORK = 50000  #task ids counted per query at most, beyond the rarest trigram
+    CANDIDATES = 200  #tasks scored exactly per query
+    
+    def __init__(self):
+        self.postings = {}  #trigram -> ids of the tasks containing it
+        self.contents = {}  #task id -> the description the task is indexed under
+    
+    @staticmethod
+    def trigrams(text):
+        #the words padded with spaces, so word starts and ends count as well
+        text = " " + " ".join(SearchIndex.tokenize(text)) + " "
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    
+    def rebuild(self, tasks):
+        self.postings = {}
+        self.contents = {}
+        self.add_many(tasks)
+    
+    def add_many(self, tasks):
+        for task in tasks:
+            self.add(task)
+    
+    def add(self, task):
+        postings = self.postings
+        self.contents[task.id] = task.content
+        for trigram in self.trigrams(task.content):
+            ids = postings.get(trigram)
+            if ids is None:
+                ids = postings[trigram] = set()
+            ids.add(task.id)
+    
+    def remove(self, task):
+        content = self.contents.pop(task.id, None)
+        if content is None:
+            return
+        for trigram in self.trigrams(content):
+            ids = self.postings[trigram]
+            ids.discard(task.id)
+            if not ids:
+                del self.postings[trigram]
+    
+    def remove_many(self, tasks):
+        for task in tasks:
+            self.remove(task)
+    
+    def update(self, task):
+        #index a task again after its description changed
+        if self.contents.get(task.id) != task.content:
+            self.remove(task)
+            self.add(task)
+    
+    def best_matches(self, query, limit=10):
+        #[(score, task id), ...] of the tasks most like query, best first. the score is
+        #the share of the query's trigrams the task has, ties go to the task with the
+        #fewest other trigrams
+        query_trigrams = self.trigrams(query)
+        if not query_trigrams:
+            return []
+        # Count shared trigrams starting from the rarest; trigrams in nearly every task
+        # say little and cost the most, they are left out once enough work was done
+        counts = Counter()
+        work = 0
+        for trigram in sorted(query_trigrams, key=lambda trigram: len(self.postings.get(trigram, ()))):
+            ids = self.postings.get(trigram)
+            if not ids:
+                continue
+            if counts and work + len(ids) > self.CANDIDATE_WORK:
+                break
+            counts.update(ids)
+            work += len(ids)
+        
+        # Score the best candidates with all their trigrams
+        scored = []
+        for task_id, _ in counts.most_common(self.CANDIDATES):
+            trigrams = self.trigrams(self.contents[task_id])
+            shared = len(query_trigrams & trigrams)
+            scored.append((shared / len(query_trigrams), shared / len(query_trigrams | trigrams), task_id))
+        return [(score, task_id) for score, _, task_id in nlargest(limit, scored)]
+
+# Crash-safe saving: files are written in full to a temporary file, fsynced and then
+# renamed over the old one, so a crash can never leave a half-written save behind.
+# The previous saves are kept as <file>.1, <file>.2 and every save starts with a
+# checksum line, so loading can tell a damaged file apart and use the newest good copy
+CHECKSUM_PREFIX = b"#checksum sha256:"
+
+def save_json_file(path, data, backups=2, indent=4):
+    body = json.dumps(data, indent=indent, default=str).encode("utf-8")
+    header = CHECKSUM_PREFIX + hashlib.sha256(body).hexdigest().encode("ascii") + b"\n"
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header + body)
+        f.flush()
+        os.fsync(f.fileno())
+    # Keep the last good saves
+    if os.path.exists(path):
+        for i in range(backups, 1, -1):
+            if os.path.exists(f"{path}.{i - 1}"):
+                os.replace(f"{path}.{i - 1}", f"{path}.{i}")
+        if backups:
+            os.replace(path, f"{path}.1")
+    os.replace(temp_path, path)
+    # Make sure the renames themselves reach the disk
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass  # not supported on every platform (e.g. Windows)
+
+def load_json_file(path, backups=2):
+    #returns the data of the newest intact copy of a file written by save_json_file,
+    #or None if there is no usable copy at all. files saved before checksums were added
+    #(plain JSON) are still accepted
+    # A finished .tmp file is newer than the backups (crash between the two renames)
+    candidates = [path, path + ".tmp"] + [f"{path}.{i}" for i in range(1, backups + 1)]
+    for candidate in candidates:
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, "rb") as f:
+                content = f.read()
+            if content.startswith(CHECKSUM_PREFIX):
+                header, _, content = content.partition(b"\n")
+                checksum = header[len(CHECKSUM_PREFIX):].decode("ascii")
+                if hashlib.sha256(content).hexdigest() != checksum:
+                    raise ValueError("checksum mismatch")
+            elif candidate.endswith(".tmp"):
+                continue  # never finished writing
+            data = json.loads(content.decode("utf-8"))
+        except Exception as e:
+            print(f"Damaged save {candidate} ({e}), trying an older copy")
+            continue
+        if candidate != path:
+            print(f"Recovered {path} from {candidate}")
+        return data
+    return None
+
+class TaskJournal:
+    #append-only log of task changes, so a single action only writes one small record
+    #instead of rewriting the whole board. the journal is replayed on top of the last
+    #snapshot (kanban_tasks.json) when loading and folded back into it every so often.
+    #records are buffered by append() and written out by write_pending(), which the
+    #persistence service runs on its background thread. every record gets a sequence
+    #number, so once a snapshot has been written the records it holds can be dropped
+    #while the ones made after it was taken are kept.
+    #a snapshot rewrites the whole board, so it is taken once the journal holds
+    #compact_ratio records per task in the last one (at least compact_every); that keeps
+    #the cost per action the same however big the board gets
+    def __init__(self, path="kanban_tasks.journal", compact_every=200, compact_ratio=0.25):
+        self.path = path
+        self.compact_every = compact_every
+        self.compact_ratio = compact_ratio
+        self.snapshot_size = 0  # number of tasks in the last snapshot
+        self.record_count = 0
+        self.sequence = 0  # number of the last record appended
+        self.pending = []  # [(sequence, line), ...] not written yet
+        self.written = []  # [(sequence, line), ...] written since the file was last emptied
+        self.saved_upto = None  # records up to this number are in a written snapshot
+        self.lock = threading.Lock()
+
+    def append(self, op, task, column=None):
+        #queue one compact record per mutation, keyed by task id
+        record = {"op": op, "id": task.id}
+        if column is not None:
+            record["column"] = column
+        if op in ("add", "edit"):
+            record["task"] = task.to_dict()
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self.lock:
+            self.sequence += 1
+            self.pending.append((self.sequence, line))
+        self.record_count += 1
+
+    def write_pending(self):
+        #write the queued records. after a snapshot was written the file is rewritten
+        #with only the records the snapshot doesn't hold
+        with self.lock:
+            lines = self.pending
+            saved_upto = self.saved_upto
+            self.pending = []
+            self.saved_upto = None
+        try:
+            if saved_upto is not None:
+                # Whatever was in the file before this session is older than the snapshot
+                kept = [(sequence, line) for sequence, line in self.written + lines if sequence > saved_upto]
+                if not kept and not os.path.exists(self.path):
+                    return  # nothing to empty (e.g. in "json" storage mode)
+                with open(self.path, "w") as f:
+                    f.writelines(line for _, line in kept)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.written = kept
+            elif lines:
+                with open(self.path, "a") as f:
+                    f.writelines(line for _, line in lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.written.extend(lines)
+        except Exception:
+            # Nothing is dropped, the next write tries again
+            with self.lock:
+                self.pending = lines + self.pending
+                if saved_upto is not None and self.saved_upto is None:
+                    self.saved_upto = saved_upto
+            raise
+
+    def compaction_limit(self):
+        return max(self.compact_every, int(self.snapshot_size * self.compact_ratio))
+    
+    def needs_compaction(self):
+        return self.record_count >= self.compaction_limit()
+
+    def replay(self, tasks):
+        #apply the journal on top of the snapshot in tasks ({column: {id: Task}})
+        #every record sets an absolute state, so replaying records that are already
+        #part of the snapshot (e.g. after a crash during compaction) is harmless
+        self.snapshot_size = sum(len(column) for column in tasks.values())
+        self.record_count = 0
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    #a half-written last line from a crash, skip it (it still counts,
+                    #so loading compacts the journal before anything is appended after it)
+                    print("Skipping damaged journal record")
+                    self.record_count += 1
+                    continue
+                task_id = record.get("id")
+                # Ids of deleted tasks must not be handed out again either
+                Task.reserve_id(task_id)
+                old_column = None
+                for column in tasks:
+                    if task_id in tasks[column]:
+                        old_column = column
+                        break
+                op = record.get("op")
+                try:
+                    if op in ("add", "edit"):
+                        new_task = Task.from_dict(record["task"])
+                        column = record.get("column") or old_column or "todo"
+                        if old_column is not None and old_column != column:
+                            del tasks[old_column][task_id]
+                        # Replacing an existing entry keeps its place in the column
+                        tasks[column][task_id] = new_task
+                    elif op == "move" and old_column is not None:
+                        tasks[record["column"]][task_id] = tasks[old_column].pop(task_id)
+                    elif op == "delete" and old_column is not None:
+                        del tasks[old_column][task_id]
+                except Exception as e:
+                    print(f"Error replaying journal record: {e}")
+                    continue
+                self.record_count += 1
+        return self.record_count
+
+    def snapshot_taken(self, size):
+        #called when a snapshot of size tasks is taken, returns the number of the last
+        #record it holds (for snapshot_saved once it is on disk)
+        self.snapshot_size = size
+        self.record_count = 0
+        with self.lock:
+            return self.sequence
+
+    def snapshot_failed(self):
+        self.record_count = self.compaction_limit()
+
+    def snapshot_saved(self, sequence):
+        #the snapshot holding the records up to sequence is safely written, they are
+        #dropped from the file on the next write
+        with self.lock:
+            self.saved_upto = max(sequence, self.saved_upto or 0)
+
+class PersistenceService:
+    #writes files on a background thread so the window never waits for the disk.
+    #callers schedule a write function under a key; a newer write for the same key
+    #replaces the pending one, and nothing is written until no new writes have been
+    #scheduled for quiet_period seconds, so a burst of changes ends in a single write.
+    #changes that keep coming don't hold the write back for longer than max_delay seconds
+    def __init__(self, quiet_period=0.5, max_delay=5.0):
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self.pending = {}  # key -> write function, in the order they were last scheduled
+        self.first_change = 0  # when the oldest pending write was scheduled
+        self.last_change = 0
+        self.running = True
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        # Held while writing, so flush() and the worker never write at the same time
+        self.write_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="persistence", daemon=True)
+        self.thread.start()
+
+    def schedule(self, key, write):
+        with self.lock:
+            self.last_change = time.monotonic()
+            if not self.pending:
+                self.first_change = self.last_change
+            self.pending.pop(key, None)
+            self.pending[key] = write
+            self.changed.notify()
+
+    def run(self):
+        while True:
+            with self.lock:
+                while self.running and not self.pending:
+                    self.changed.wait()
+                if not self.running:
+                    return
+                # Wait for the quiet period after the latest change, or until the oldest
+                # one has waited long enough
+                while self.running:
+                    deadline = min(self.last_change + self.quiet_period, self.first_change + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.changed.wait(remaining)
+            self.flush()
+
+    def flush(self):
+        #write everything that is pending right away, on the calling thread
+        with self.write_lock:
+            with self.lock:
+                writes = list(self.pending.items())
+                self.pending.clear()
+            for key, write in writes:
+                try:
+                    with monitor.span(f"write_{key}", "persistence"):
+                        write()
+                except Exception as e:
+                    print(f"Error writing file: {e}")
+
+    def close(self):
+        #stop the worker and write what is left (called when the window closes)
+        with self.lock:
+            self.running = False
+            self.changed.notify()
+        self.thread.join()
+        self.flush()
+
+class SqliteTaskStore:
+    #optional SQLite storage for the board ("sqlite" storage mode). each task is one row,
+    #so a change is a single-row INSERT/UPDATE/DELETE and a column is read in order through
+    #the (status, position) index instead of scanning the whole board. changes are queued
+    #and committed together by write_pending(), which the persistence service runs on its
+    #background thread; reads write out anything queued first so they see every change
+    def __init__(self, path="kanban_tasks.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.pending = []
+        # WAL lets readers and the writer work at the same time and makes commits cheap
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                content TEXT NOT NULL,
+                due_date TEXT,
+                priority TEXT NOT NULL,
+                status TEXT NOT NULL,
+                position INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, position);
+            -- Nothing looks tasks up by these, they only slowed down every write
+            DROP INDEX IF EXISTS idx_tasks_due_date;
+            DROP INDEX IF EXISTS idx_tasks_priority;
+            CREATE TABLE IF NOT EXISTS board_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+        # New and moved tasks go to the end of their column
+        row = self.conn.execute("SELECT COALESCE(MAX(position), 0) FROM tasks").fetchone()
+        self.next_position = row[0] + 1
+        # Continue the task id counter where the board left off
+        row = self.conn.execute("SELECT value FROM board_meta WHERE key = 'next_id'").fetchone()
+        if row is not None:
+            Task.reserve_id(row[0] - 1)
+
+    def close(self):
+        self.write_pending()
+        with self.lock:
+            self.conn.close()
+
+    def write_pending(self):
+        #commit all queued changes in one transaction
+        with self.lock:
+            if not self.pending:
+                return
+            statements = self.pending
+            self.pending = []
+            with self.conn:
+                for sql, params in statements:
+                    self.conn.execute(sql, params)
+
+    def query(self, sql, params=()):
+        self.write_pending()
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def holds_board(self):
+        #False for a new database. replace_all marks the database as holding the board,
+        #so one whose tasks were all deleted is not mistaken for a new one (databases
+        #from before the mark have their next_id or tasks instead)
+        return bool(self.query("SELECT 1 FROM board_meta LIMIT 1") or
+                    self.query("SELECT 1 FROM tasks LIMIT 1"))
+
+    def row_to_task(self, row):
+        task_id, content, due_date, priority = row
+        due_date = datetime.strptime(due_date, "%Y-%m-%d").date() if due_date else None
+        return Task(content, due_date, priority, task_id)
+
+    def load_column(self, status):
+        #all tasks of one column in board order, as {id: Task}
+        rows = self.query(
+            "SELECT id, content, due_date, priority FROM tasks WHERE status = ? ORDER BY position",
+            (status,))
+        column = {}
+        for row in rows:
+            task = self.row_to_task(row)
+            column[task.id] = task
+        return column
+
+    def task_values(self, task, status):
+        due_date = task.due_date.isoformat() if task.due_date else None
+        position = self.next_position
+        self.next_position += 1
+        return (task.id, task.content, due_date, task.priority, status, position)
+
+    def queue(self, sql, params):
+        with self.lock:
+            self.pending.append((sql, params))
+
+    def insert(self, task, status):
+        self.queue("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?)",
+                   self.task_values(task, status))
+        self.queue("INSERT OR REPLACE INTO board_meta VALUES ('next_id', ?)", (Task.next_id,))
+
+    def update(self, task):
+        due_date = task.due_date.isoformat() if task.due_date else None
+        self.queue("UPDATE tasks SET content = ?, due_date = ?, priority = ? WHERE id = ?",
+                   (task.content, due_date, task.priority, task.id))
+
+    def move(self, task, status):
+        self.queue("UPDATE tasks SET status = ?, position = ? WHERE id = ?",
+                   (status, self.next_position, task.id))
+        self.next_position += 1
+
+    def delete(self, task):
+        self.queue("DELETE FROM tasks WHERE id = ?", (task.id,))
+
+    def replace_all(self, tasks):
+        #store a whole board ({column: [Task, ...]}), e.g. when switching to this storage mode
+        with self.lock:
+            self.pending = []
+            with self.conn:
+                self.conn.execute("DELETE FROM tasks")
+                self.next_position = 1
+                for status in ["todo", "doing", "done"]:
+                    self.conn.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?)",
+                                          [self.task_values(task, status) for task in tasks[status].values()])
+                self.conn.execute("INSERT OR REPLACE INTO board_meta VALUES ('next_id', ?)", (Task.next_id,))
+                self.conn.execute("INSERT OR REPLACE INTO board_meta VALUES ('board', 1)")
+
+    def import_json(self, path="kanban_tasks.json", journal=None):
+        #one-shot import of a board saved by the JSON storage modes
+        tasks = {"todo": {}, "doing": {}, "done": {}}
+        tasks_data = load_json_file(path)
+        if tasks_data is not None:
+            Task.reserve_id(tasks_data.get("next_id", 1) - 1)
+            for column in tasks:
+                for task_dict in tasks_data.get(column, []):
+                    try:
+                        task = Task.from_dict(task_dict)
+                        if any(task.id in tasks[c] for c in tasks):
+                            # Older saves used memory addresses as ids, which can repeat
+                            task.id = Task.new_id()
+                        tasks[column][task.id] = task
+                    except Exception as e:
+                        print(f"Error importing task: {e}")
+        # Include changes that were only journaled so far
+        if journal is not None:
+            journal.replay(tasks)
+        self.replace_all(tasks)
+        return sum(len(tasks[column]) for column in tasks)
+
+
+COLUMNS = ["todo", "doing", "done"]
+
+class KanbanEngine:
+    #the board itself: the tasks in their columns, the indexes over them and where they
+    #are saved. every change goes through here and is saved by the persistence service;
+    #the methods return what changed so a view can redraw just that
+    def __init__(self, persistence, storage_mode="journal", tasks_path="kanban_tasks.json",
+                 journal_path="kanban_tasks.journal", database_path="kanban_tasks.db"):
+        self.persistence = persistence
+        self.storage_mode = storage_mode  # "json", "journal" or "sqlite"
+        self.tasks_path = tasks_path
+        self.database_path = database_path
+        
+        # Tasks by id per column, in column order
+        self.tasks = {column: {} for column in COLUMNS}
+        # Every task by id, with the column it is in
+        self.task_index = {}
+        # Where each task is in its column: numbers that only grow as tasks are placed,
+        # so sorting by them gives column order
+        self.positions = {}
+        self.next_position = 0
+        # Goes up whenever a task is placed or taken out, so views can cache by it
+        self.layout_version = 0
+        # Tasks with a due date, sorted by it (for the calendar)
+        self.due_index = DueDateIndex()
+        # Words of the task descriptions (for searching)
+        self.search_index = SearchIndex()
+        # Trigrams of the task descriptions (for the typo tolerant quick switcher)
+        self.trigram_index = TrigramIndex()
+        
+        # Journal of changes since the last full save (used in "journal" storage mode)
+        self.journal = TaskJournal(journal_path)
+        # Database used in "sqlite" storage mode, opened by load
+        self.store = None
+        # True while a saved board is being loaded (see start_loading)
+        self.loading = False
+    
+    def column_of(self, task):
+        return self.task_index[task.id][0]
+    
+    def place_task(self, task, column):
+        #put a task at the end of a column and index it by id
+        self.tasks[column][task.id] = task
+        self.task_index[task.id] = (column, task)
+        self.positions[task.id] = self.next_position
+        self.next_position += 1
+        self.layout_version += 1
+    
+    def take_task(self, task):
+        #remove a task from its column and the index, returns the column it was in
+        column = self.task_index.pop(task.id)[0]
+        del self.tasks[column][task.id]
+        del self.positions[task.id]
+        self.layout_version += 1
+        return column
+    
+    def add_task(self, content, due_date=None, priority="medium", column="todo"):
+        task = Task(content, due_date, priority)
+        self.place_task(task, column)
+        self.due_index.add(task)
+        self.search_index.add(task)
+        self.trigram_index.add(task)
+        self.record_change("add", task, column)
+        return task
+    
+    def edit_task(self, task, content, due_date, priority):
+        #change a task, returns its column and the due dates that changed
+        old_due_date = task.due_date
+        task.content = content
+        task.due_date = due_date
+        task.priority = priority
+        self.due_index.update(task)
+        self.search_index.update(task)
+        self.trigram_index.update(task)
+        
+        column = self.column_of(task)
+        self.record_change("edit", task, column)
+        return column, {old_due_date, due_date} - {None}
+    
+    def move_tasks(self, tasks, to_column):
+        #move any number of tasks as one change, saved once. returns the columns that
+        #changed and how many tasks were newly completed
+        changed_columns = {to_column}
+        completed = 0
+        for task in tasks:
+            from_column = self.take_task(task)
+            self.place_task(task, to_column)
+            changed_columns.add(from_column)
+            if to_column == "done" and from_column != "done":
+                completed += 1
+        self.record_changes("move", tasks, to_column)
+        return changed_columns, completed
+    
+    def delete_tasks(self, tasks):
+        #delete any number of tasks as one change, returns the columns and due dates
+        #that changed
+        changed_columns = set()
+        for task in tasks:
+            changed_columns.add(self.take_task(task))
+        self.due_index.remove_many(tasks)
+        self.search_index.remove_many(tasks)
+        self.trigram_index.remove_many(tasks)
+        self.record_changes("delete", tasks)
+        return changed_columns, {task.due_date for task in tasks} - {None}
+    
+    def search(self, query):
+        #ids of the tasks whose description matches query, None for an empty query
+        return self.search_index.search(query)
+    
+    def tasks_by_column(self, task_ids):
+        #the tasks with these ids, per column in column order ({column: [Task, ...]}).
+        #built from the ids, sorted by position, so a search that matches a few tasks
+        #costs little however big the board is; when most of the board matches,
+        #going through the columns is cheaper than sorting
+        if len(task_ids) * 16 > len(self.task_index):
+            return {column: [task for task in self.tasks[column].values() if task.id in task_ids]
+                    for column in COLUMNS}
+        positions = self.positions
+        grouped = {column: [] for column in COLUMNS}
+        for task_id in sorted((task_id for task_id in task_ids if task_id in positions),
+                              key=positions.__getitem__):
+            column, task = self.task_index[task_id]
+            grouped[column].append(task)
+        return grouped
+    
+    def find_similar(self, query, limit=10):
+        #[(column, task), ...] of the tasks most like query in any column, best first
+        return [self.task_index[task_id] for _, task_id in self.trigram_index.best_matches(query, limit)]
+    
+    def set_storage_mode(self, mode):
+        #switch where tasks are saved, taking the current board along. raises if the
+        #new storage can't be set up, leaving the old one in use
+        if mode == self.storage_mode:
+            return
+        if mode == "sqlite":
+            store = SqliteTaskStore(self.database_path)
+            store.replace_all(self.tasks)
+            self.store = store
+            self.storage_mode = mode
+        else:
+            self.storage_mode = mode
+            self.save_tasks()
+            if self.store is not None:
+                self.store.close()
+                self.store = None
+    
+    def load(self):
+        #Load previously written tasks from JSON file (or the database in sqlite mode)
+        results = self.start_loading(background=False)
+        if results is not None:
+            while self.loading:
+                self.add_loaded(results.get_nowait())
+    
+    def start_loading(self, background=True, batch_size=2000):
+        #begin loading the saved board. the JSON file is read, parsed and turned into
+        #tasks on a loader thread, which puts them in the returned queue batch by batch;
+        #the thread owning the board passes each item to add_loaded until loading is
+        #False. the database (sqlite mode) is loaded right away and None is returned
+        self.tasks = {column: {} for column in COLUMNS}
+        self.task_index = {}
+        self.positions = {}
+        self.layout_version += 1
+        self.search_index.rebuild([])
+        self.trigram_index.rebuild([])
+        self.loaded_indexes = None
+        self.loading = True
+        self.load_started = time.perf_counter()
+        self.load_reassigned = False
+        if self.storage_mode == "sqlite":
+            try:
+                self.load_from_database()
+            except Exception as e:
+                print(f"Error loading tasks: {e}")
+            self.finish_loading()
+            return None
+        
+        results = queue.Queue()
+        if background:
+            threading.Thread(target=self.read_saved_tasks, args=(results, batch_size),
+                             name="task loader", daemon=True).start()
+        else:
+            self.read_saved_tasks(results, batch_size)
+        return results
+    
+    def read_saved_tasks(self, results, batch_size):
+        #runs on the loader thread: it only reads the file and makes Task objects, the
+        #board itself is filled in by add_loaded
+        try:
+            # Newest intact save (falls back to the last good copy if the file is damaged)
+            tasks_data = load_json_file(self.tasks_path)
+            if tasks_data is None:
+                print("No saved tasks found")
+            else:
+                # Never hand out ids again that were used before. the counter belongs to
+                # the window's thread: it gets the id to continue from before any task
+                # (add_loaded may give a repeated id a new one), and the tasks are built
+                # here without touching it
+                next_id = tasks_data.get("next_id", 1)
+                for column in COLUMNS:
+                    for task_dict in tasks_data.get(column, []):
+                        task_id = task_dict.get("id") if isinstance(task_dict, dict) else None
+                        if isinstance(task_id, int) and task_id >= next_id:
+                            next_id = task_id + 1
+                results.put(("next_id", next_id))
+                # The search indexes are built here too, the window has enough to do
+                search_index = SearchIndex()
+                trigram_index = TrigramIndex()
+                def hand_over(column, batch):
+                    # Indexed before add_loaded sees the tasks, it may give some a new id
+                    search_index.add_many(batch)
+                    trigram_index.add_many(batch)
+                    results.put(("tasks", column, batch))
+                for column in COLUMNS:
+                    batch = []
+                    for task_dict in tasks_data.get(column, []):
+                        try:
+                            batch.append(Task.from_dict(task_dict, reserve=False))
+                        except Exception as e:
+                            print(f"Error loading task: {e}")
+                            continue
+                        if len(batch) >= batch_size:
+                            hand_over(column, batch)
+                            batch = []
+                    if batch:
+                        hand_over(column, batch)
+                # Sorted here as well, or the first search after loading would do it
+                search_index.sort_words()
+                results.put(("indexes", search_index, trigram_index))
+        except Exception as e:
+            print(f"Error loading tasks: {e}")
+        results.put(("done",))
+    
+    def add_loaded(self, item):
+        #take one item from the loader's queue, returns the column that got tasks (if any)
+        if item[0] == "next_id":
+            Task.reserve_id(item[1] - 1)
+        elif item[0] == "tasks":
+            _, column, tasks = item
+            for task in tasks:
+                if task.id in self.task_index:
+                    # Older saves used memory addresses as ids, which can repeat
+                    task.id = Task.new_id()
+                    self.load_reassigned = True
+                self.place_task(task, column)
+            return column
+        elif item[0] == "indexes":
+            self.loaded_indexes = item[1:]
+        elif item[0] == "done":
+            self.finish_loading()
+        return None
+    
+    def finish_loading(self):
+        try:
+            # Apply changes made since the last full save, then fold them into a new one
+            replayed = self.store is None and self.journal.replay(self.tasks)
+            if replayed:
+                print(f"Replayed {replayed} journal records")
+            if replayed or self.load_reassigned:
+                self.save_tasks()
+            
+            # Index the tasks by id, position, due date and words
+            self.task_index = {}
+            self.positions = {}
+            self.next_position = 0
+            for column in COLUMNS:
+                for task in self.tasks[column].values():
+                    self.task_index[task.id] = (column, task)
+                    self.positions[task.id] = self.next_position
+                    self.next_position += 1
+            self.layout_version += 1
+            self.due_index.rebuild(task for _, task in self.task_index.values())
+            # The loader indexed the words as it read them, unless the journal changed
+            # the tasks since or ids had to be reassigned (or the database was loaded)
+            if self.loaded_indexes is not None and not (replayed or self.load_reassigned):
+                search_index, trigram_index = self.loaded_indexes
+                search_index.version = self.search_index.version + 1
+                self.search_index, self.trigram_index = search_index, trigram_index
+            else:
+                self.search_index.rebuild(task for _, task in self.task_index.values())
+                self.trigram_index.rebuild(task for _, task in self.task_index.values())
+            self.loaded_indexes = None
+            
+            print(f"Loaded {len(self.tasks['todo'])} todo, {len(self.tasks['doing'])} doing, {len(self.tasks['done'])} done tasks")
+        except Exception as e:
+            print(f"Error loading tasks: {e}")
+        self.loading = False
+        monitor.finish("load_tasks", "persistence", self.load_started)
+    
+    def load_from_database(self):
+        self.store = SqliteTaskStore(self.database_path)
+        # First start in sqlite mode: bring over the board saved as JSON
+        if not self.store.holds_board():
+            imported = self.store.import_json(self.tasks_path, self.journal)
+            if imported:
+                print(f"Imported {imported} tasks into the database")
+        for column in COLUMNS:
+            self.tasks[column] = self.store.load_column(column)
+    
+    def record_change(self, op, task, column=None):
+        #persist a single change ("add", "move", "edit" or "delete") to a task
+        self.record_changes(op, [task], column)
+    
+    def record_changes(self, op, tasks, column=None):
+        #persist the same change to a number of tasks with a single write
+        if self.store is not None:
+            try:
+                for task in tasks:
+                    if op == "add":
+                        self.store.insert(task, column)
+                    elif op == "move":
+                        self.store.move(task, column)
+                    elif op == "edit":
+                        self.store.update(task)
+                    elif op == "delete":
+                        self.store.delete(task)
+            except Exception as e:
+                print(f"Error saving task to database: {e}")
+            self.persistence.schedule("database", self.store.write_pending)
+            return
+        if self.storage_mode != "journal":
+            self.save_tasks()
+            return
+        # A change too big for the journal goes straight into a full save
+        if len(tasks) >= self.journal.compaction_limit():
+            self.save_tasks()
+            return
+        try:
+            for task in tasks:
+                self.journal.append(op, task, column)
+        except Exception as e:
+            print(f"Error writing journal: {e}")
+            self.save_tasks()
+            return
+        self.persistence.schedule("journal", self.journal.write_pending)
+        # Every so often the journal is folded into a new snapshot. its records are only
+        # dropped once that is written, so a failed save loses nothing
+        if self.journal.needs_compaction():
+            self.save_tasks()
+    
+    @monitor.timed("save_tasks", "persistence")
+    def save_tasks(self):
+        #Save tasks to JSON file. the file is written by the persistence service in the
+        #background; only the (cheap) copy of the column lists happens here
+        columns = {column: list(self.tasks[column].values()) for column in COLUMNS}
+        next_id = Task.next_id
+        tasks_path = self.tasks_path
+        journal = self.journal
+        sequence = journal.snapshot_taken(sum(len(tasks) for tasks in columns.values()))
+        
+        def write():
+            try:
+                tasks_data = {
+                    "todo": [task.to_dict() for task in columns["todo"]],
+                    "doing": [task.to_dict() for task in columns["doing"]],
+                    "done": [task.to_dict() for task in columns["done"]],
+                    "next_id": next_id
+                }
+                save_json_file(tasks_path, tasks_data)
+                
+                print(f"Saved {len(columns['todo'])} todo, {len(columns['doing'])} doing, {len(columns['done'])} done tasks")
+            except Exception as e:
+                # The journal keeps everything the failed snapshot held, the next change
+                # tries another snapshot
+                print(f"Error saving tasks: {e}")
+                journal.snapshot_failed()
+                return
+            # Only now the journal records in the snapshot can go
+            journal.snapshot_saved(sequence)
+            journal.write_pending()
+        self.persistence.schedule("tasks", write)
+    
+    def close(self):
+        #the persistence service must have been flushed (or closed) before this
+        if self.store is not None:
+            self.store.close()
+            self.store = None
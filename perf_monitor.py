@@ -0,0 +1,312 @@
+"""Opt-in timing hooks for the task manager's hot paths.
+
+Functions decorated with monitor.timed(name) record how long each call took into a
+ring buffer per name (the last `capacity` calls), which the performance overlay turns
+into p50/p95 figures. Recording is off unless the overlay is open or the app was
+started with KANBAN_PERF=1; while it is off a decorated function costs one attribute
+check per call.
+
+The same hooks feed tracing: between start_trace() and stop_trace() every hooked call
+is kept as a span and save_trace() writes them in Chrome's trace event format (open
+the file in chrome://tracing or https://ui.perfetto.dev). A Heartbeat adds the times
+the Tk event loop was blocked, so a stall lines up with the spans that caused it, and
+a Watchdog samples the main thread's stack while the loop is blocked for longer than
+a budget and logs what it was doing.
+
+Only the standard library is used, so the engine and benchmarks can use it without Tk.
+"""
+import contextlib
+import functools
+import json
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+
+def percentile(values, fraction):
+    #nearest-rank percentile of an already sorted list
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+class PerformanceMonitor:
+    def __init__(self, capacity=500, trace_capacity=200000):
+        self.enabled = False
+        self.capacity = capacity
+        self.samples = {}  # name -> deque of the last call durations in seconds
+        self.counts = {}  # name -> calls recorded since the last reset
+        self.tracing = False
+        self.trace_capacity = trace_capacity
+        self.trace_events = deque(maxlen=trace_capacity)  # the newest spans of the trace
+        self.thread_names = {}  # thread id -> name, for the trace viewer
+        # Saves run on the persistence thread, so recording has to be thread safe
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.capacity)
+            samples.append(seconds)
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def finish(self, name, category, start, args=None):
+        #a hooked call that began at start (a perf_counter time) has just ended
+        duration = time.perf_counter() - start
+        if self.enabled:
+            self.record(name, duration)
+        if self.tracing:
+            self.add_trace_event(name, category, start, duration, args)
+
+    def timed(self, name, category="app"):
+        #decorator timing every call under name while recording or tracing. the
+        #category groups the spans in a trace ("action", "render", "persistence", ...)
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not (self.enabled or self.tracing):
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.finish(name, category, start)
+            return wrapper
+        return decorate
+
+    @contextlib.contextmanager
+    def span(self, name, category="app", args=None):
+        #the same as timed, for a block of code
+        if not (self.enabled or self.tracing):
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.finish(name, category, start, args)
+
+    def add_trace_event(self, name, category, start, duration, args=None):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",  # a complete event: start and duration
+            "ts": start * 1e6,  # microseconds
+            "dur": duration * 1e6,
+            "pid": os.getpid(),
+            "tid": thread.ident
+        }
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.trace_events.append(event)
+            self.thread_names[thread.ident] = thread.name
+
+    def start_trace(self):
+        with self.lock:
+            self.trace_events = deque(maxlen=self.trace_capacity)
+            self.thread_names = {}
+        self.tracing = True
+
+    def stop_trace(self):
+        self.tracing = False
+
+    def save_trace(self, path):
+        #write the recorded spans as a Chrome trace, returns the number of spans
+        with self.lock:
+            events = list(self.trace_events)
+            thread_names = dict(self.thread_names)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                     "args": {"name": thread_name}}
+                    for tid, thread_name in thread_names.items()]
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+        os.replace(temp_path, path)
+        return len(events)
+
+    def stats(self):
+        #{name: {"count", "p50", "p95", "max"}} (durations in seconds), by name
+        with self.lock:
+            snapshot = {name: (sorted(samples), self.counts[name])
+                        for name, samples in self.samples.items() if samples}
+        return {name: {"count": count,
+                       "p50": percentile(values, 0.50),
+                       "p95": percentile(values, 0.95),
+                       "max": values[-1]}
+                for name, (values, count) in sorted(snapshot.items())}
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.counts = {}
+
+# Shared by the whole application
+monitor = PerformanceMonitor()
+monitor.enabled = os.environ.get("KANBAN_PERF") == "1"
+
+def process_rss():
+    #resident memory of this process in bytes, None if it can't be found out
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    # Not the current size but the peak, the closest macOS offers without extra modules
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class Heartbeat:
+    #notices when the Tk event loop was blocked. a callback is scheduled with after()
+    #every interval; when it runs more than threshold later than asked, the time since
+    #the previous beat is recorded as an "event_loop_stall" (a span in the trace and an
+    #entry in the stats) that covers whatever kept the loop busy
+    def __init__(self, root, interval_ms=50, threshold_ms=100, monitor=monitor):
+        self.root = root
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.monitor = monitor
+        self.job = None
+        self.last_beat = None
+        self.stalls = 0
+
+    def is_running(self):
+        return self.job is not None
+
+    def start(self):
+        if self.job is None:
+            self.last_beat = time.perf_counter()
+            self.job = self.root.after(int(self.interval * 1000), self.beat)
+
+    def stop(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def beat(self):
+        now = time.perf_counter()
+        gap = now - self.last_beat
+        late = gap - self.interval
+        if late >= self.threshold:
+            self.stalls += 1
+            if self.monitor.enabled:
+                self.monitor.record("event_loop_stall", late)
+            if self.monitor.tracing:
+                self.monitor.add_trace_event("event_loop_stall", "stall", self.last_beat, gap,
+                                             {"late_ms": round(late * 1000, 1)})
+        self.last_beat = now
+        self.job = self.root.after(int(self.interval * 1000), self.beat)
+
+class Watchdog:
+    #finds out what blocks the Tk event loop without a profiler. the main thread checks
+    #in every check interval through after(); a background thread notices when it has
+    #not checked in for longer than the budget and samples the main thread's stack until
+    #it does again. then one compact report goes to the log: the callback that was
+    #running, how long it blocked, the stack seen most often and the board size
+    def __init__(self, root, budget_ms=500, log_path="kanban_slow.log", board_size=None,
+                 check_ms=50, max_log_bytes=1024 * 1024):
+        self.root = root
+        self.budget = budget_ms / 1000
+        self.log_path = log_path
+        self.board_size = board_size  # function returning the number of tasks
+        self.check_interval = check_ms / 1000
+        self.max_log_bytes = max_log_bytes
+        self.main_thread_id = threading.main_thread().ident
+        self.last_check_in = time.perf_counter()
+        self.job = None
+        self.thread = None
+        self.running = False
+        self.reports = 0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.check_in()
+        self.thread = threading.Thread(target=self.run, name="watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def check_in(self):
+        #runs on the main thread whenever the event loop is free
+        self.last_check_in = time.perf_counter()
+        self.job = self.root.after(int(self.check_interval * 1000), self.check_in)
+
+    def sample_stack(self):
+        frame = sys._current_frames().get(self.main_thread_id)
+        if frame is None:
+            return None
+        return tuple((os.path.basename(summary.filename), summary.lineno, summary.name)
+                     for summary in traceback.extract_stack(frame))
+
+    def run(self):
+        samples = []
+        blocked_since = None
+        while self.running:
+            time.sleep(self.check_interval)
+            last_check_in = self.last_check_in
+            if time.perf_counter() - last_check_in > self.budget + self.check_interval:
+                blocked_since = last_check_in
+                stack = self.sample_stack()
+                if stack:
+                    samples.append(stack)
+            elif samples:
+                # The loop is free again: the block lasted until this check in
+                self.report(last_check_in - blocked_since, samples)
+                samples = []
+
+    @staticmethod
+    def operation(stack):
+        #the callback Tk was running: the first frame after the innermost tkinter one
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index][0] == "__init__.py" and stack[index][2] in ("__call__", "callit"):
+                if index + 1 < len(stack):
+                    return stack[index + 1][2]
+        return stack[-1][2]
+
+    def report(self, duration, samples):
+        stacks = {}
+        lines = {}
+        for stack in samples:
+            stacks[stack] = stacks.get(stack, 0) + 1
+            lines[stack[-1]] = lines.get(stack[-1], 0) + 1
+        stack, seen = max(stacks.items(), key=lambda item: item[1])
+        board_size = "unknown"
+        if self.board_size is not None:
+            try:
+                board_size = self.board_size()
+            except Exception:
+                pass
+        operation = self.operation(stack)
+        report = [f"{datetime.now():%Y-%m-%d %H:%M:%S} {operation} blocked the event loop for "
+                  f"{duration:.2f} s (board: {board_size} tasks, {len(samples)} samples)",
+                  f"  stack seen in {seen}/{len(samples)} samples:"]
+        report += [f"    {filename}:{lineno} {name}" for filename, lineno, name in stack[-12:]]
+        hottest = sorted(lines.items(), key=lambda item: -item[1])[:5]
+        report.append("  hottest lines: " + ", ".join(
+            f"{filename}:{lineno} {name} ({count})" for (filename, lineno, name), count in hottest))
+        self.reports += 1
+        try:
+            # Keep the log small: the previous one is kept as <log>.1
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.max_log_bytes:
+                os.replace(self.log_path, self.log_path + ".1")
+            with open(self.log_path, "a") as f:
+                f.write("\n".join(report) + "\n\n")
+            print(f"Slow operation: {operation} took {duration:.2f} s (see {self.log_path})")
+        except OSError as e:
+            print(f"Error writing slow operation report: {e}")